@@ -0,0 +1,73 @@
+#!/bin/bash
+# Быстрый прогон тестов обоих проектов с настройками settings_test (база
+# в памяти из мигрированного шаблона, дешёвый хэшер паролей). На
+# нескольких ядрах проекты идут одновременно, а с pytest-xdist каждый
+# ещё и в несколько воркеров. --compare сначала замеряет обычный последовательный прогон.
+# Выводы pytest и время лежат в $LOG_DIR.
+
+LOG_DIR="${LOG_DIR:=$(mktemp -d)}"
+mkdir -p "$LOG_DIR"
+PYTEST_ARGS=(--tb=line -q --durations=10)
+if python -c 'import xdist' 2>/dev/null; then
+    PYTEST_ARGS+=(-n auto)
+fi
+
+now () {
+    date +%s.%N
+}
+
+elapsed () {
+    python -c "print(f'{$2 - $1:.2f}')"
+}
+
+run_project () {
+    # Аргументы: каталог проекта, модуль настроек, имя лога.
+    local started=$(now)
+    (cd "$1" && DJANGO_SETTINGS_MODULE="$2" python -m pytest "${PYTEST_ARGS[@]}") \
+        > "$LOG_DIR/$3.log" 2>&1
+    local status=$?
+    echo "$(elapsed "$started" "$(now)")" > "$LOG_DIR/$3.time"
+    return $status
+}
+
+if [[ "$1" == "--compare" ]]; then
+    started=$(now)
+    run_project ya_news yanews.settings baseline-news \
+        && run_project ya_note yanote.settings baseline-note \
+        || { echo "Обычный прогон упал, см. $LOG_DIR" 1>&2; exit 1; }
+    baseline=$(elapsed "$started" "$(now)")
+fi
+
+started=$(now)
+if (( $(nproc) > 1 )); then
+    run_project ya_news yanews.settings_test news &
+    news_pid=$!
+    run_project ya_note yanote.settings_test note &
+    note_pid=$!
+    wait $news_pid
+    news_status=$?
+    wait $note_pid
+    note_status=$?
+else
+    run_project ya_news yanews.settings_test news
+    news_status=$?
+    run_project ya_note yanote.settings_test note
+    note_status=$?
+fi
+total=$(elapsed "$started" "$(now)")
+
+for project in news note; do
+    echo "=== ya_$project: $(cat "$LOG_DIR/$project.time") с ==="
+    sed -n '/slowest 10 durations/,$p' "$LOG_DIR/$project.log"
+done
+echo "Быстрый прогон: $total с"
+if [[ -n "$baseline" ]]; then
+    echo "Обычный прогон: $baseline с" \
+         "(ya_news $(cat "$LOG_DIR/baseline-news.time") с," \
+         "ya_note $(cat "$LOG_DIR/baseline-note.time") с)"
+fi
+echo "Логи: $LOG_DIR"
+
+if [[ $news_status -ne 0 || $note_status -ne 0 ]]; then
+    exit 1
+fi
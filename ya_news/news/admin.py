@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import Comment, News
+from .models import BannedWord, Comment, News
+from .profanity import stats
 
 
 class CommentInline(admin.StackedInline):
@@ -13,3 +14,13 @@ class NewsAdmin(admin.ModelAdmin):
     inlines = [
         CommentInline,
     ]
+
+
+@admin.register(BannedWord)
+class BannedWordAdmin(admin.ModelAdmin):
+    search_fields = ('word',)
+
+    def changelist_view(self, request, extra_context=None):
+        """Показывает статистику пересборок движка в этом процессе."""
+        extra_context = {**(extra_context or {}), 'matcher_stats': stats}
+        return super().changelist_view(request, extra_context)
@@ -0,0 +1,109 @@
+"""
+Архив новостей по годам, месяцам и дням.
+
+Число новостей по дням считается одним запросом ``GROUP BY date``,
+который идёт по индексу ``(date, id)`` без сортировки, а суммы по
+месяцам и годам складываются из него. Результат хранится в кэше
+фрагментов (``NEWS_FRAGMENT_CACHE``) и сбрасывается сигналами при
+добавлении, правке и удалении новостей. Новости периода выбираются
+курсором по паре ``(date, id)``: любая страница — это поиск по тому же
+индексу в обратном порядке, без сортировки и без смещения.
+"""
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Count, Q
+
+from . import cache
+from .models import News
+from .pagination import parse_id
+
+COUNTS_KEY = 'news:archive:counts'
+
+stats = Counter(hits=0, misses=0, invalidations=0)
+
+
+def counts_queryset():
+    """Число новостей по дням в порядке индекса, без сортировки."""
+    return News.objects.order_by('date').values_list('date').annotate(
+        count=Count('pk')
+    )
+
+
+def compute_counts():
+    days = dict(counts_queryset())
+    months = Counter()
+    years = Counter()
+    for day, count in days.items():
+        months[day.year, day.month] += count
+        years[day.year] += count
+    return {'days': days, 'months': dict(months), 'years': dict(years)}
+
+
+def get_counts():
+    """Число новостей по дням, месяцам ``(год, месяц)`` и годам."""
+    counts = cache.get_cache().get(COUNTS_KEY)
+    if counts is not None:
+        stats['hits'] += 1
+        return counts
+    stats['misses'] += 1
+    counts = compute_counts()
+    cache.get_cache().set(
+        COUNTS_KEY, counts, settings.NEWS_FRAGMENT_CACHE_TIMEOUT
+    )
+    return counts
+
+
+def invalidate():
+    cache.get_cache().delete(COUNTS_KEY)
+    stats['invalidations'] += 1
+
+
+def period_bounds(year, month=None, day=None):
+    """Полуинтервал дат периода; для несуществующей даты — ValueError."""
+    try:
+        return dates_between(year, month, day)
+    except OverflowError:
+        raise ValueError(f'Год вне допустимого диапазона: {year}')
+
+
+def dates_between(year, month, day):
+    if day is not None:
+        start = date(year, month, day)
+        return start, start + timedelta(days=1)
+    if month is not None:
+        start = date(year, month, 1)
+        if month == 12:
+            return start, date(year + 1, 1, 1)
+        return start, date(year, month + 1, 1)
+    return date(year, 1, 1), date(year + 1, 1, 1)
+
+
+def encode_cursor(news):
+    """Курсор вида ``<ГГГГММДД>-<id>``."""
+    return f'{news.date:%Y%m%d}-{news.pk}'
+
+
+def decode_cursor(cursor):
+    """Разбирает курсор; для некорректного значения бросает ValueError."""
+    day, pk = cursor.split('-')
+    return datetime.strptime(day, '%Y%m%d').date(), parse_id(pk)
+
+
+def page_queryset(start, end, cursor=None):
+    news = News.objects.filter(
+        date__gte=start, date__lt=end
+    ).only('title', 'date').order_by('-date', '-id')
+    if cursor:
+        day, pk = decode_cursor(cursor)
+        news = news.filter(Q(date__lt=day) | Q(id__lt=pk), date__lte=day)
+    return news
+
+
+def get_page(start, end, size, cursor=None):
+    """Новости периода от новых к старым и курсор следующей страницы."""
+    page = list(page_queryset(start, end, cursor)[:size + 1])
+    if len(page) > size:
+        return page[:size], encode_cursor(page[size - 1])
+    return page, None
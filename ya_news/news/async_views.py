@@ -0,0 +1,81 @@
+"""
+Асинхронные варианты главной и страницы новости для запуска под ASGI.
+
+В Django 3.2 нет асинхронного ORM и асинхронной отрисовки шаблонов.
+Поэтому вся работа с базой — отпечаток для ETag, новости, комментарии,
+пользователь из сессии — делается за один переход в поток через
+``sync_to_async``, а шаблон рисуется уже в цикле событий: к этому
+моменту все ленивые объекты запроса вычислены. Контекст собирают те же
+классы, что и в синхронных представлениях. Включаются настройкой
+``NEWS_ASYNC_VIEWS``.
+"""
+import time
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, HttpResponseNotAllowed
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from . import conditional
+from .views import NewsComment, NewsDetail, NewsList
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def load_list(view):
+    view.object_list = list(view.get_queryset())
+    return view.get_context_data()
+
+
+def load_detail(view):
+    view.object = view.get_object()
+    return view.get_context_data(object=view.object)
+
+
+def fetch(view, load):
+    """Работа представления с базой: ответ 304 или контекст и заголовки."""
+    request, kwargs = view.request, view.kwargs
+    # Пользователь из сессии загружается лениво; вычисляем его здесь.
+    request.user.is_authenticated
+    headers = {}
+    etag = conditional.etag(request, **kwargs)
+    if etag is not None:
+        etag = headers['ETag'] = quote_etag(etag)
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        return response, None, headers
+    return None, load(view), headers
+
+
+async def respond(request, view_class, load, **kwargs):
+    view = view_class()
+    view.setup(request, **kwargs)
+    response, context, headers = await sync_to_async(fetch)(view, load)
+    if response is None:
+        started = time.perf_counter()
+        response = HttpResponse(render_to_string(
+            view.get_template_names(), context, request
+        ))
+        timer = getattr(request, 'query_timer', None)
+        if timer is not None:
+            timer.render_duration = time.perf_counter() - started
+    for name, value in headers.items():
+        response[name] = value
+    return response
+
+
+async def news_list(request):
+    """Главная: как ``NewsList``."""
+    if request.method not in SAFE_METHODS:
+        return HttpResponseNotAllowed(SAFE_METHODS)
+    return await respond(request, NewsList, load_list)
+
+
+async def news_detail(request, pk):
+    """Страница новости: как ``NewsDetailView``, POST — в ``NewsComment``."""
+    if request.method == 'POST':
+        return await sync_to_async(NewsComment.as_view())(request, pk=pk)
+    if request.method not in SAFE_METHODS:
+        return HttpResponseNotAllowed(('POST', *SAFE_METHODS))
+    return await respond(request, NewsDetail, load_detail, pk=pk)
@@ -0,0 +1,936 @@
+"""Сценарии замеров производительности для ``manage.py benchmark``.
+
+Каждый сценарий получает список размеров данных и возвращает строки
+результатов. Команда выполняет сценарий в транзакции и откатывает её,
+поэтому тестовые данные не остаются в базе. Сценарии с
+``atomic=False`` гоняют запросы из других потоков, которые не видят
+незафиксированных данных, поэтому работают во временной базе.
+"""
+import asyncio
+import importlib
+import io
+import json
+import random
+import statistics
+import tempfile
+import time
+import threading
+import tracemalloc
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.asgi import get_asgi_application
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.wsgi import get_wsgi_application
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import Count
+from django.template import engines
+from django.template.loader import render_to_string
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import clear_url_caches, reverse
+
+from . import cache, events, ranking, ratelimit, rendering
+from .db import pool
+from .models import Comment, News
+from .routers import MigrationRouter
+from .pagination import get_comments_page
+from .profanity import RegexEngine
+
+BATCH_SIZE = 5000
+ALPHABET = 'абвгдежзийклмнопрстуфхцчшщъыьэюя'
+SCENARIOS = {}
+
+
+def scenario(default_sizes, atomic=True):
+    """Регистрирует сценарий под именем функции."""
+    def decorator(func):
+        func.default_sizes = default_sizes
+        func.atomic = atomic
+        SCENARIOS[func.__name__] = func
+        return func
+    return decorator
+
+
+def measure(func, repeat=5):
+    """Число запросов, среднее время и пиковая память вызова ``func``."""
+    tracemalloc.start()
+    with CaptureQueriesContext(connection) as queries:
+        func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = (time.perf_counter() - started) / repeat
+    return {
+        'queries': len(queries),
+        'ms': round(elapsed * 1000, 2),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def create_news(count):
+    """Создаёт ``count`` новостей с текстом средней длины."""
+    return [
+        News.objects.create(
+            title=f'Новость {index}', text='Текст новости. ' * 50
+        )
+        for index in range(count)
+    ]
+
+
+def create_comments(news, count):
+    """Быстро создаёт ``count`` комментариев к новости."""
+    author, _ = get_user_model().objects.get_or_create(username='bench')
+    Comment.objects.bulk_create(
+        (
+            Comment(news=news, author=author, text=f'Комментарий {index}')
+            for index in range(count)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+
+@scenario(default_sizes=(10, 1000, 100000))
+def comment_counts(sizes):
+    """Счётчики комментариев на главной: prefetch против агрегата."""
+    limit = settings.NEWS_COUNT_ON_HOME_PAGE
+
+    def prefetch():
+        for news in News.objects.prefetch_related('comment_set')[:limit]:
+            news.comment_set.count()
+
+    def annotate():
+        for news in News.objects.annotate(
+            comment_count=Count('comment')
+        )[:limit]:
+            news.comment_count
+
+    rows = []
+    created = 0
+    news = News.objects.create(title='Горячая новость', text='Текст')
+    for size in sizes:
+        create_comments(news, size - created)
+        created = size
+        for name, func in (('prefetch', prefetch), ('annotate', annotate)):
+            rows.append({'comments': size, 'variant': name, **measure(func)})
+    return rows
+
+
+@scenario(default_sizes=(100, 1000))
+def home_cache(sizes):
+    """Пропускная способность главной с кэшем фрагментов и без него."""
+    client = Client(HTTP_HOST='localhost')
+    url = reverse('news:home')
+    for news in create_news(settings.NEWS_COUNT_ON_HOME_PAGE):
+        create_comments(news, 10)
+    rows = []
+    for requests in sizes:
+        for variant in ('cold', 'warm'):
+            cache.get_cache().clear()
+            hits = cache.stats['hits']
+            started = time.perf_counter()
+            for _ in range(requests):
+                if variant == 'cold':
+                    cache.get_cache().clear()
+                client.get(url)
+            elapsed = time.perf_counter() - started
+            rows.append({
+                'requests': requests,
+                'variant': variant,
+                'rps': round(requests / elapsed),
+                'hits': cache.stats['hits'] - hits,
+            })
+    return rows
+
+
+def random_words(rng, count):
+    return [
+        ''.join(rng.choices(ALPHABET, k=rng.randint(6, 10)))
+        for _ in range(count)
+    ]
+
+
+@scenario(default_sizes=(10, 1000, 50000))
+def profanity(sizes):
+    """Проверка 10 КБ комментария: цикл по словам против движка."""
+    rng = random.Random(0)
+    text = ' '.join(random_words(rng, 2000))[:10 * 1024]
+
+    def loop(words):
+        lowered_text = text.lower()
+        return any(word in lowered_text for word in words)
+
+    rows = []
+    for size in sizes:
+        words = random_words(rng, size)
+        started = time.perf_counter()
+        engine = RegexEngine(words)
+        build_ms = round((time.perf_counter() - started) * 1000, 1)
+        for variant, func, build in (
+            ('loop', lambda: loop(words), 0),
+            ('engine', lambda: engine.search(text), build_ms),
+        ):
+            started = time.perf_counter()
+            for _ in range(10):
+                func()
+            rows.append({
+                'terms': size,
+                'variant': variant,
+                'build_ms': build,
+                'ms': round((time.perf_counter() - started) * 100, 3),
+            })
+    return rows
+
+
+@scenario(default_sizes=(2000,))
+def instrumentation(sizes):
+    """Накладные расходы InstrumentationMiddleware на главной."""
+    middleware = 'news.instrumentation.InstrumentationMiddleware'
+    variants = (
+        ('without', [
+            name for name in settings.MIDDLEWARE if name != middleware
+        ]),
+        ('with', settings.MIDDLEWARE),
+    )
+    for news in create_news(settings.NEWS_COUNT_ON_HOME_PAGE):
+        create_comments(news, 10)
+    url = reverse('news:home')
+    clients = {}
+    for variant, names in variants:
+        # Цепочка middleware собирается при первом запросе клиента.
+        with override_settings(MIDDLEWARE=names):
+            clients[variant] = Client(HTTP_HOST='localhost')
+            clients[variant].get(url)
+    rows = []
+    for requests in sizes:
+        timings = dict.fromkeys(clients, 0.0)
+        # Варианты чередуются пачками, чтобы дрейф машины делился поровну.
+        batch = max(min(requests, 50), 1)
+        requests = max(requests // batch, 1) * batch
+        for _ in range(requests // batch):
+            for variant, client in clients.items():
+                started = time.perf_counter()
+                for _ in range(batch):
+                    client.get(url)
+                timings[variant] += time.perf_counter() - started
+        rows.append({
+            'requests': requests,
+            'without_us': round(timings['without'] / requests * 1e6),
+            'with_us': round(timings['with'] / requests * 1e6),
+            'overhead_pct': round(
+                (timings['with'] / timings['without'] - 1) * 100, 2
+            ),
+        })
+    return rows
+
+
+@scenario(default_sizes=(10000,))
+def import_news(sizes):
+    """Загрузка JSONL командой import_news при разных размерах пачки."""
+    rows = []
+    for size in sizes:
+        with tempfile.NamedTemporaryFile(
+            'w', suffix='.jsonl', encoding='utf-8'
+        ) as file:
+            for index in range(size):
+                file.write(json.dumps({
+                    'external_id': f'bench-{index}',
+                    'title': f'Новость {index}',
+                    'text': 'Текст новости. ' * 50,
+                }) + '\n')
+            file.flush()
+            for batch_size in (1, 100, 1000, 5000):
+                # Каждый прогон начинает с пустой таблицы и откатывается.
+                with transaction.atomic():
+                    tracemalloc.start()
+                    started = time.perf_counter()
+                    call_command(
+                        'import_news', file.name,
+                        batch_size=batch_size, stdout=io.StringIO(),
+                    )
+                    elapsed = time.perf_counter() - started
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                    transaction.set_rollback(True)
+                rows.append({
+                    'rows': size,
+                    'batch_size': batch_size,
+                    'rows_per_s': round(size / elapsed),
+                    'peak_kb': round(peak / 1024, 1),
+                })
+    return rows
+
+
+@scenario(default_sizes=(10, 10000, 100000))
+def rate_limit(sizes):
+    """Цена проверки лимита на запрос: только LRU и LRU с общим кэшем."""
+    hits = 50000
+    rows = []
+    for keys in sizes:
+        names = [f'comment:{index}:127.0.0.1' for index in range(keys)]
+        variants = (('local', None), ('shared', caches['default']))
+        for variant, shared in variants:
+            limiter = ratelimit.RateLimiter(
+                hits, 60, ratelimit.LocalStore(maxsize=keys), shared
+            )
+            started = time.perf_counter()
+            for index in range(hits):
+                limiter.hit(names[index % keys])
+            elapsed = time.perf_counter() - started
+            rows.append({
+                'keys': keys,
+                'variant': variant,
+                'us_per_hit': round(elapsed / hits * 1e6, 2),
+            })
+    return rows
+
+
+def add_database(alias, name, **options):
+    """Регистрирует псевдоним базы на время замера."""
+    connections.settings[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3', 'NAME': name, **options,
+    }
+    connections.ensure_defaults(alias)
+    connections.prepare_test_settings(alias)
+
+
+def migrate(alias):
+    """Миграции базы ``alias``; их данные тоже пишутся в неё."""
+    with override_settings(DATABASE_ROUTERS=[MigrationRouter(alias)]):
+        call_command('migrate', database=alias, verbosity=0)
+
+
+def remove_database(alias):
+    connections[alias].close()
+    del connections[alias]
+    connections.settings.pop(alias)
+
+
+def create_news_on(alias, count):
+    """Как create_news, но в базе с псевдонимом ``alias``."""
+    return [
+        News.objects.using(alias).create(
+            title=f'Новость {index}', text='Текст новости. ' * 50
+        )
+        for index in range(count)
+    ]
+
+
+def run_load(threads, write_alias, read_alias, operations=200):
+    """Потоки читают главную и пишут комментарии (один из пяти)."""
+    author = get_user_model().objects.db_manager(write_alias).create(
+        username='load'
+    )
+    news = create_news_on(write_alias, settings.NEWS_COUNT_ON_HOME_PAGE)
+    timings = {'read': [], 'write': []}
+    errors = Counter()
+
+    def worker(seed):
+        rng = random.Random(seed)
+        try:
+            for _ in range(operations):
+                kind = 'write' if rng.random() < 0.2 else 'read'
+                started = time.perf_counter()
+                try:
+                    if kind == 'write':
+                        Comment.objects.using(write_alias).create(
+                            news=rng.choice(news), author=author,
+                            text='Комментарий под нагрузкой',
+                        )
+                    else:
+                        list(News.objects.using(read_alias).annotate(
+                            comment_count=Count('comment')
+                        )[:settings.NEWS_COUNT_ON_HOME_PAGE])
+                except OperationalError:
+                    errors[kind] += 1
+                    continue
+                timings[kind].append(time.perf_counter() - started)
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(worker, range(threads)))
+    rows = []
+    for kind, values in timings.items():
+        cuts = statistics.quantiles(values, n=100)
+        rows.append({
+            'kind': kind,
+            'ok': len(values),
+            'errors': errors[kind],
+            'p50_ms': round(cuts[49] * 1000, 2),
+            'p99_ms': round(cuts[98] * 1000, 2),
+        })
+    return rows
+
+
+@scenario(default_sizes=(8,))
+def sqlite_load(sizes):
+    """Задержки из потоков: SQLite по умолчанию против WAL и реплики."""
+    rows = []
+    for threads in sizes:
+        for variant in ('default', 'wal'):
+            with tempfile.TemporaryDirectory() as directory:
+                name = str(Path(directory) / 'db.sqlite3')
+                pragmas = settings.SQLITE_PRAGMAS if variant == 'wal' else {}
+                with override_settings(SQLITE_PRAGMAS=pragmas):
+                    add_database('load', name)
+                    read_alias = 'load'
+                    if variant == 'wal':
+                        add_database('load_replica', f'file:{name}?mode=ro')
+                        read_alias = 'load_replica'
+                    try:
+                        migrate('load')
+                        results = run_load(threads, 'load', read_alias)
+                    finally:
+                        remove_database('load')
+                        if variant == 'wal':
+                            remove_database('load_replica')
+            for row in results:
+                rows.append({'threads': threads, 'variant': variant, **row})
+    return rows
+
+
+@scenario(default_sizes=(1000,))
+def connection_pool(sizes):
+    """Цикл запроса главной: новое соединение на запрос против пула."""
+    variants = (
+        ('fresh', {}),
+        ('pooled', {
+            'ENGINE': 'news.db.sqlite3', 'POOL': settings.DATABASE_POOL,
+        }),
+    )
+    rows = []
+    for requests in sizes:
+        for variant, options in variants:
+            with tempfile.TemporaryDirectory() as directory:
+                alias = 'pool_bench'
+                add_database(
+                    alias, str(Path(directory) / 'db.sqlite3'), **options
+                )
+                try:
+                    migrate(alias)
+                    create_news_on(alias, settings.NEWS_COUNT_ON_HOME_PAGE)
+                    connection = connections[alias]
+                    connection.close()
+                    before = Counter(pool.stats)
+                    started = time.perf_counter()
+                    for _ in range(requests):
+                        list(News.objects.using(alias).annotate(
+                            comment_count=Count('comment')
+                        )[:settings.NEWS_COUNT_ON_HOME_PAGE])
+                        # Так соединение закрывает request_finished.
+                        connection.close_if_unusable_or_obsolete()
+                    elapsed = time.perf_counter() - started
+                    used = pool.stats - before
+                finally:
+                    remove_database(alias)
+                    if alias in pool.pools:
+                        pool.pools.pop(alias).close_all()
+            rows.append({
+                'requests': requests,
+                'variant': variant,
+                'us_per_request': round(elapsed / requests * 1e6),
+                'pool_hits': used['hits'],
+                'pool_opens': used['opens'],
+            })
+    return rows
+
+
+@contextmanager
+def scratch_database():
+    """Переключает default и replica на временный файл SQLite."""
+    aliases = ('default', 'replica')
+    names = {alias: connections[alias].settings_dict['NAME']
+             for alias in aliases}
+
+    def reconnect(default, replica):
+        for alias in aliases:
+            connections[alias].close()
+            if alias in pool.pools:
+                pool.pools.pop(alias).close_all()
+        # Соединения других потоков создаются из connections.settings.
+        for alias, name in zip(aliases, (default, replica)):
+            connections.settings[alias]['NAME'] = name
+            connections[alias].settings_dict['NAME'] = name
+
+    with tempfile.TemporaryDirectory() as directory:
+        name = str(Path(directory) / 'db.sqlite3')
+        reconnect(name, f'file:{name}?mode=ro')
+        try:
+            call_command('migrate', verbosity=0)
+            yield
+        finally:
+            reconnect(names['default'], names['replica'])
+
+
+@contextmanager
+def news_async_views(enabled):
+    """Собирает маршруты заново с нужным значением NEWS_ASYNC_VIEWS."""
+    def reload_urls():
+        for module in ('news.urls', settings.ROOT_URLCONF):
+            importlib.reload(importlib.import_module(module))
+        clear_url_caches()
+
+    try:
+        with override_settings(NEWS_ASYNC_VIEWS=enabled):
+            reload_urls()
+            yield
+    finally:
+        reload_urls()
+
+
+def wsgi_environ(path):
+    return {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'HTTP_HOST': 'localhost',
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': io.StringIO(),
+    }
+
+
+def asgi_scope(path):
+    """Scope GET-запроса, как его собирает uvicorn."""
+    return {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(b'host', b'localhost')],
+        'client': ('127.0.0.1', 50000),
+        'server': ('localhost', 80),
+    }
+
+
+async def asgi_get(application, path):
+    """Один GET-запрос к приложению ASGI."""
+    scope = asgi_scope(path)
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            assert message['status'] == 200, message['status']
+
+    await application(scope, receive, send)
+
+
+def run_wsgi(paths, requests, concurrency, threads):
+    application = get_wsgi_application()
+
+    def call(index):
+        result = application(
+            wsgi_environ(paths[index % len(paths)]), lambda *args: None
+        )
+        b''.join(result)
+        result.close()
+        threads.append(threading.active_count())
+
+    with ThreadPoolExecutor(concurrency) as executor:
+        list(executor.map(call, range(requests)))
+
+
+def run_asgi(paths, requests, concurrency, threads):
+    application = get_asgi_application()
+    indexes = iter(range(requests))
+
+    async def worker():
+        for index in indexes:
+            await asgi_get(application, paths[index % len(paths)])
+            threads.append(threading.active_count())
+
+    async def main():
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    asyncio.run(main())
+
+
+@scenario(default_sizes=(1, 10, 50), atomic=False)
+def asgi_load(sizes):
+    """Главная и новость: WSGI, ASGI с обычными и async-представлениями."""
+    requests = 1000
+    variants = (
+        ('wsgi', run_wsgi, False),
+        ('asgi_sync', run_asgi, False),
+        ('asgi_async', run_asgi, True),
+    )
+    rows = []
+    with scratch_database(), override_settings(DEBUG=False):
+        for news in create_news(settings.NEWS_COUNT_ON_HOME_PAGE):
+            create_comments(news, 20)
+        paths = ['/', reverse('news:detail', args=(news.pk,))]
+        for concurrency in sizes:
+            for variant, run, enabled in variants:
+                with news_async_views(enabled):
+                    threads = []
+                    started = time.perf_counter()
+                    run(paths, requests, concurrency, threads)
+                    elapsed = time.perf_counter() - started
+                    tracemalloc.start()
+                    run(paths, concurrency * 4, concurrency, [])
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                rows.append({
+                    'concurrency': concurrency,
+                    'variant': variant,
+                    'rps': round(requests / elapsed),
+                    'kb_per_connection': round(peak / 1024 / concurrency, 1),
+                    'max_threads': max(threads),
+                })
+    return rows
+
+
+@scenario(default_sizes=(1000, 10000))
+def comment_events(sizes):
+    """Ожидающие соединения ленты комментариев и рассылка одного события."""
+    news = create_news(1)[0]
+    author, _ = get_user_model().objects.get_or_create(username='bench')
+    path = reverse('news:events', args=(news.pk,))
+    application = events.EventsApplication(None)
+    rows = []
+    for count in sizes:
+        events.reset()
+        received = []
+
+        async def main():
+            disconnected = asyncio.Event()
+            delivered = asyncio.Event()
+
+            async def receive():
+                await disconnected.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                if message.get('body', b'').startswith(b'id:'):
+                    received.append(time.perf_counter())
+                    if len(received) == count:
+                        delivered.set()
+
+            tracemalloc.start()
+            started = time.perf_counter()
+            tasks = [
+                asyncio.ensure_future(
+                    application(asgi_scope(path), receive, send)
+                )
+                for _ in range(count)
+            ]
+            while events.stats['subscribers'] < count:
+                await asyncio.sleep(0)
+            connect = time.perf_counter() - started
+            memory, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            threads = threading.active_count()
+            comment = await sync_to_async(Comment.objects.create)(
+                news=news, author=author, text='Новый комментарий'
+            )
+            published = time.perf_counter()
+            await sync_to_async(events.publish_comment)(comment)
+            await delivered.wait()
+            disconnected.set()
+            await asyncio.gather(*tasks)
+            return connect, memory, threads, published
+
+        connect, memory, threads, published = async_to_sync(main)()
+        rows.append({
+            'connections': count,
+            'connect_ms': round(connect * 1000),
+            'kb_per_connection': round(memory / 1024 / count, 2),
+            'threads': threads,
+            'fan_out_ms': round((max(received) - published) * 1000, 1),
+            'first_ms': round((min(received) - published) * 1000, 2),
+        })
+    return rows
+
+
+def percentile(values, fraction):
+    """Перцентиль по ближайшему рангу для отсортированного списка."""
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def url_requests(user):
+    """
+    GET-запрос к каждому маршруту ``news.urls`` на данных из базы.
+
+    Комментарий для правки и удаления создаётся от имени ``user``,
+    поэтому вызывать внутри откатываемой транзакции.
+    """
+    news = News.objects.first()
+    day = news.date
+    comment = Comment.objects.create(
+        news=news, author=user, text='Комментарий для замера'
+    )
+    return {
+        'news:home': (reverse('news:home'), {}),
+        'news:search': (
+            reverse('news:search'), {'q': news.title.split()[0]}
+        ),
+        'news:detail': (reverse('news:detail', args=(news.pk,)), {}),
+        'news:archive': (reverse('news:archive'), {}),
+        'news:archive_year': (
+            reverse('news:archive_year', args=(day.year,)), {}
+        ),
+        'news:archive_month': (
+            reverse('news:archive_month', args=(day.year, day.month)), {}
+        ),
+        'news:archive_day': (
+            reverse('news:archive_day',
+                    args=(day.year, day.month, day.day)), {}
+        ),
+        'news:comments': (reverse('news:comments', args=(news.pk,)), {}),
+        'news:events': (reverse('news:events', args=(news.pk,)), {}),
+        'news:delete': (reverse('news:delete', args=(comment.pk,)), {}),
+        'news:edit': (reverse('news:edit', args=(comment.pk,)), {}),
+        'news:comments_export': (
+            reverse('news:comments_export'), {'news': news.pk}
+        ),
+        'news:metrics': (reverse('news:metrics'), {}),
+    }
+
+
+def measure_urls(client, requests, repeat):
+    """Перцентили времени ответа и число SQL-запросов по маршрутам."""
+    rows = {}
+    for name, (url, params) in requests.items():
+        client.get(url, params)
+        timings = []
+        queries = 0
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(url, params)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                timings.append((time.perf_counter() - started) * 1000)
+            assert response.status_code < 400, (name, response.status_code)
+            queries = max(queries, len(captured))
+        timings.sort()
+        rows[name] = {
+            'p50_ms': round(percentile(timings, 0.5), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+            'p99_ms': round(percentile(timings, 0.99), 2),
+            'queries': queries,
+        }
+    return rows
+
+
+def compare_urls(baseline, current, tolerance, slack_ms=1):
+    """
+    Регрессии относительно базовой линии.
+
+    Число запросов не должно расти вовсе, медиана — больше чем в
+    ``1 + tolerance`` раз и не меньше чем на ``slack_ms``: на
+    маршрутах быстрее миллисекунды иначе срабатывает шум. p95 и p99
+    на десятках запросов слишком шумные, они только для отчёта.
+    """
+    regressions = []
+    for name, row in current.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if row['queries'] > base['queries']:
+            regressions.append(
+                f'{name}: запросов {base["queries"]} -> {row["queries"]}'
+            )
+        limit = max(base['p50_ms'] * (1 + tolerance),
+                    base['p50_ms'] + slack_ms)
+        if row['p50_ms'] > limit:
+            regressions.append(
+                f'{name}: p50 {base["p50_ms"]} -> {row["p50_ms"]} мс'
+            )
+    return regressions
+
+
+def uncached_templates():
+    """Настройка TEMPLATES без кэширующего загрузчика."""
+    templates = [dict(backend) for backend in settings.TEMPLATES]
+    for backend in templates:
+        options = backend['OPTIONS'] = dict(backend['OPTIONS'])
+        options['loaders'] = [
+            loader for name, loaders in options['loaders']
+            for loader in loaders
+        ]
+    return templates
+
+
+@scenario(default_sizes=(20,))
+def template_render(sizes):
+    """
+    Стоимость шаблонов по маршрутам: без кэша загрузчика и с ним.
+
+    ``first_ms`` — первый запрос после сброса кэша без прогрева,
+    ``warm_first_ms`` — после ``rendering.warm_up``; ``render_ms`` —
+    медиана собственного времени шаблонов страницы, ``top`` — самый дорогой.
+    """
+    for news in create_news(settings.NEWS_COUNT_ON_HOME_PAGE):
+        create_comments(news, 10)
+    user = get_user_model().objects.create(username='render', is_staff=True)
+    requests = url_requests(user)
+    client = Client(HTTP_HOST='localhost')
+    client.force_login(user)
+
+    def first_request(name, warm):
+        engines['django'].engine.template_loaders[0].reset()
+        if warm:
+            rendering.warm_up()
+        url, params = requests[name]
+        started = time.perf_counter()
+        client.get(url, params)
+        return round((time.perf_counter() - started) * 1000, 2)
+
+    rows = []
+    for repeat in sizes:
+        with override_settings(TEMPLATES=uncached_templates()):
+            uncached = measure_urls(client, requests, repeat)
+        cached = measure_urls(client, requests, repeat)
+        for name, (url, params) in requests.items():
+            renders = [
+                client.get(url, params).wsgi_request.query_timer.templates
+                for _ in range(repeat)
+            ]
+            templates = renders[-1]
+            if not templates:
+                continue
+            top = max(templates, key=templates.get)
+            rows.append({
+                'view': name,
+                'uncached_ms': uncached[name]['p50_ms'],
+                'cached_ms': cached[name]['p50_ms'],
+                'render_ms': round(statistics.median(
+                    sum(render.values()) for render in renders
+                ) * 1000, 2),
+                'first_ms': first_request(name, warm=False),
+                'warm_first_ms': first_request(name, warm=True),
+                'top': f'{top} {templates[top] * 1000:.2f}',
+            })
+    return rows
+
+
+@scenario(default_sizes=(50, 10000))
+def comment_authors(sizes):
+    """
+    Лента комментариев: полные строки авторов против id и имени.
+
+    Тема из ``max(sizes)`` комментариев сотни авторов с заполненными
+    профилями; для каждого размера страница загружается и отдельно
+    рисуется шаблоном ленты в обоих вариантах.
+    """
+    User = get_user_model()
+    news = create_news(1)[0]
+    password = make_password('password')
+    User.objects.bulk_create(
+        User(
+            username=f'author-{index}', password=password,
+            email=f'author-{index}@example.com',
+            first_name='Имя', last_name='Фамилия',
+        )
+        for index in range(500)
+    )
+    authors = list(
+        User.objects.filter(username__startswith='author-')
+        .values_list('pk', flat=True)
+    )
+    Comment.objects.bulk_create(
+        (
+            Comment(news=news, author_id=authors[index % len(authors)],
+                    text=f'Комментарий {index}')
+            for index in range(max(sizes))
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    viewer = User.objects.get(pk=authors[0])
+    variants = {
+        'full': lambda size: list(
+            Comment.objects.filter(news=news).select_related('author')
+            .order_by('created', 'id')[:size]
+        ),
+        'narrow': lambda size: get_comments_page(news.pk, size)[0],
+    }
+    rows = []
+    for size in sizes:
+        for variant, load in variants.items():
+            loaded = measure(lambda: load(size))
+            comments = load(size)
+            rendered = measure(lambda: render_to_string(
+                'news/includes/comments.html',
+                {'news': news, 'comments': comments, 'user': viewer},
+            ))
+            rows.append({
+                'comments': size,
+                'variant': variant,
+                'load_ms': loaded['ms'],
+                'load_kb': loaded['peak_kb'],
+                'render_ms': rendered['ms'],
+                'render_kb': rendered['peak_kb'],
+            })
+    return rows
+
+
+@scenario(default_sizes=(10000, 1000000))
+def news_ranking(sizes):
+    """
+    Главная по рейтингу на ``size`` комментариях к ``size / 100`` новостям.
+
+    ``full_s`` — полный пересчёт, ``incremental_ms`` — учёт тысячи новых
+    комментариев, ``date_ms`` и ``ranking_ms`` — запрос главной при
+    ``NEWS_HOME_ORDERING`` 'date' и 'ranking', ``plan`` — план второго.
+    """
+    rows = []
+    for seed, size in enumerate(sizes):
+        News.objects.all().delete()
+        news_count = max(size // 100, 10)
+        call_command(
+            'seed', seed=seed, users=100, news=news_count,
+            comments_per_news=size // news_count, stdout=io.StringIO(),
+        )
+        started = time.perf_counter()
+        ranking.refresh(full=True)
+        full = time.perf_counter() - started
+        author = get_user_model().objects.first()
+        news_ids = list(News.objects.values_list('pk', flat=True))
+        Comment.objects.bulk_create(
+            Comment(news_id=random.choice(news_ids), author=author,
+                    text=f'Новый комментарий {index}')
+            for index in range(1000)
+        )
+        started = time.perf_counter()
+        ranking.refresh()
+        incremental = time.perf_counter() - started
+        home = {}
+        for ordering in ('date', 'ranking'):
+            with override_settings(NEWS_HOME_ORDERING=ordering):
+                queryset = ranking.home_news()[
+                    :settings.NEWS_COUNT_ON_HOME_PAGE
+                ]
+                home[ordering] = measure(lambda: list(queryset.all()))
+        rows.append({
+            'comments': size,
+            'news': news_count,
+            'full_s': round(full, 2),
+            'incremental_ms': round(incremental * 1000, 1),
+            'date_ms': home['date']['ms'],
+            'ranking_ms': home['ranking']['ms'],
+            'plan': ' / '.join(
+                line.split('|--')[-1].strip()
+                for line in queryset.explain().splitlines()
+            ),
+        })
+    return rows
@@ -0,0 +1,65 @@
+"""
+Кэш отрисованных фрагментов новостей на главной странице.
+
+В кэше хранится пара ``(число комментариев, html)``: число приходит
+вместе с новостью из запроса главной, поэтому фрагмент с устаревшим
+счётчиком не будет показан даже до срабатывания сигналов. Правки
+самих новостей и комментариев сбрасывают фрагмент через сигналы
+и меняют метку версии новости, из которой строится ETag.
+"""
+from collections import Counter
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+
+stats = Counter(hits=0, misses=0, invalidations=0)
+
+
+def get_cache():
+    return caches[settings.NEWS_FRAGMENT_CACHE]
+
+
+def fragment_key(news_id):
+    return f'news:fragment:{news_id}'
+
+
+def version_key(news_id):
+    return f'news:version:{news_id}'
+
+
+def get_versions(news_ids):
+    """Метки версий новостей; недостающие создаются заново."""
+    cache = get_cache()
+    keys = {version_key(news_id): news_id for news_id in news_ids}
+    versions = cache.get_many(keys)
+    missing = {key: uuid4().hex for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def get_fragment(news, render):
+    """Возвращает html новости из кэша или отрисовывает его заново."""
+    cache = get_cache()
+    key = fragment_key(news.pk)
+    cached = cache.get(key)
+    if cached is not None and cached[0] == news.comment_count:
+        stats['hits'] += 1
+        return cached[1]
+    stats['misses'] += 1
+    html = render()
+    cache.set(
+        key,
+        (news.comment_count, html),
+        settings.NEWS_FRAGMENT_CACHE_TIMEOUT,
+    )
+    return html
+
+
+def invalidate(news_id):
+    cache = get_cache()
+    cache.delete(fragment_key(news_id))
+    cache.set(version_key(news_id), uuid4().hex, None)
+    stats['invalidations'] += 1
@@ -0,0 +1,31 @@
+"""Проверки настроек приложения при запуске (``manage.py check``)."""
+from numbers import Real
+
+from django.conf import settings
+from django.core.checks import Error, register
+
+POSITIVE_RANKING_SETTINGS = (
+    'HALF_LIFE_HOURS', 'NEWS_WEIGHT', 'COMMENT_WEIGHT'
+)
+
+
+@register()
+def check_news_ranking(app_configs, **kwargs):
+    """Веса и период рейтинга идут в логарифм и делитель: только > 0."""
+    errors = []
+    for name in POSITIVE_RANKING_SETTINGS:
+        value = settings.NEWS_RANKING.get(name)
+        if not isinstance(value, Real) or value <= 0:
+            errors.append(Error(
+                f'NEWS_RANKING[{name!r}] должно быть положительным '
+                f'числом, а не {value!r}.',
+                id='news.E001',
+            ))
+    lookback = settings.NEWS_RANKING.get('LOOKBACK_COMMENTS')
+    if not isinstance(lookback, int) or lookback < 0:
+        errors.append(Error(
+            'NEWS_RANKING[\'LOOKBACK_COMMENTS\'] должно быть '
+            f'неотрицательным целым, а не {lookback!r}.',
+            id='news.E002',
+        ))
+    return errors
@@ -0,0 +1,53 @@
+"""
+ETag для главной и страницы новости.
+
+Отпечаток страницы строится одним агрегирующим запросом: для каждой
+показанной новости берутся дата, время последнего комментария и число
+комментариев; новости главной выбираются в том же порядке, что и в
+``NewsList``. К нему добавляются метки версий из кэша, которые
+меняются при правке новости или комментария, и id пользователя:
+авторизованным показываются форма и ссылки на правку своих
+комментариев. Для них же учитывается CSRF-токен из cookie: после
+повторного входа он новый, и страница со старым токеном в форме не
+должна браться из кэша браузера. Совпавший ETag даёт ответ 304 без
+отрисовки шаблона. Last-Modified эти страницы не отдают: по одному
+времени не видно правок и удалений комментариев и смены пользователя.
+"""
+import hashlib
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from . import cache, ranking
+from .models import News
+
+
+def get_rows(request, **kwargs):
+    """Отпечаток новостей страницы; считается один раз на запрос."""
+    if not hasattr(request, 'news_fingerprint'):
+        if 'pk' in kwargs:
+            queryset = News.objects.filter(pk=kwargs['pk']).annotate(
+                last_comment=Max('comment__created'),
+                comment_count=Count('comment'),
+            )
+        else:
+            queryset = ranking.home_news()[
+                :settings.NEWS_COUNT_ON_HOME_PAGE
+            ]
+        request.news_fingerprint = list(queryset.values_list(
+            'pk', 'date', 'last_comment', 'comment_count'
+        ))
+    return request.news_fingerprint
+
+
+def etag(request, *args, **kwargs):
+    rows = get_rows(request, **kwargs)
+    if not rows:
+        return None
+    versions = cache.get_versions([row[0] for row in rows])
+    user = csrf = None
+    if request.user.is_authenticated:
+        user = request.user.pk
+        csrf = request.META.get('CSRF_COOKIE')
+    digest = hashlib.md5(repr((rows, versions, user, csrf)).encode())
+    return digest.hexdigest()
@@ -0,0 +1,153 @@
+"""
+Пул соединений с базой для бэкендов ``news.db.sqlite3`` и
+``news.db.postgresql``.
+
+Django 3.2 открывает соединение на каждый запрос (или держит его в
+потоке при ``CONN_MAX_AGE``). Здесь закрытие соединения возвращает его
+в пул процесса, а следующее открытие берёт готовое из пула. Пул
+включается ключом ``POOL`` в описании базы::
+
+    'POOL': {
+        'MAX_SIZE': 8,       # соединений на процесс, занятых и свободных
+        'TIMEOUT': 10,       # сколько ждать свободного места, секунды
+        'MAX_AGE': 600,      # время жизни соединения, секунды
+        'CHECK_AFTER': 30,   # простой, после которого нужен SELECT 1
+    }
+
+Счётчики ``stats`` показывает страница метрик.
+"""
+import threading
+import time
+from collections import Counter, deque
+
+from django.db import OperationalError
+
+stats = Counter()
+pools = {}
+
+
+class Pool:
+
+    def __init__(self, max_size=8, timeout=10, max_age=600, check_after=30):
+        self.timeout = timeout
+        self.max_age = max_age
+        self.check_after = check_after
+        # Свободные соединения: (соединение, создано, возвращено).
+        self.idle = deque()
+        self.slots = threading.BoundedSemaphore(max_size)
+
+    def acquire(self, connect, is_usable):
+        """Соединение из пула или новое; возвращает его и время создания."""
+        started = time.monotonic()
+        if not self.slots.acquire(blocking=False):
+            stats['waits'] += 1
+            acquired = self.slots.acquire(timeout=self.timeout)
+            stats['wait_ms'] += round((time.monotonic() - started) * 1000)
+            if not acquired:
+                stats['timeouts'] += 1
+                raise OperationalError(
+                    'Нет свободных соединений в пуле за '
+                    f'{self.timeout} с.'
+                )
+        try:
+            return self.take_idle(started, is_usable) or (
+                self.open(connect), time.monotonic()
+            )
+        except BaseException:
+            self.slots.release()
+            raise
+
+    def take_idle(self, now, is_usable):
+        while True:
+            try:
+                raw, created, returned = self.idle.pop()
+            except IndexError:
+                return None
+            if now - created >= self.max_age:
+                stats['expired'] += 1
+                close_quietly(raw)
+            elif now - returned >= self.check_after and not is_usable(raw):
+                stats['broken'] += 1
+                close_quietly(raw)
+            else:
+                stats['hits'] += 1
+                return raw, created
+
+    def open(self, connect):
+        raw = connect()
+        stats['opens'] += 1
+        return raw
+
+    def release(self, raw, created):
+        """Возвращает соединение в пул или закрывает устаревшее."""
+        now = time.monotonic()
+        if now - created >= self.max_age:
+            stats['expired'] += 1
+            close_quietly(raw)
+        else:
+            self.idle.append((raw, created, now))
+        self.slots.release()
+
+    def discard(self, raw):
+        close_quietly(raw)
+        self.slots.release()
+
+    def close_all(self):
+        while self.idle:
+            close_quietly(self.idle.pop()[0])
+
+
+def close_quietly(raw):
+    try:
+        raw.close()
+    except Exception:
+        pass
+
+
+class PooledDatabaseWrapperMixin:
+    """Подмешивается к DatabaseWrapper стандартного бэкенда."""
+
+    def get_pool(self):
+        options = self.settings_dict.get('POOL')
+        if not options:
+            return None
+        pool = pools.get(self.alias)
+        if pool is None:
+            pool = pools.setdefault(self.alias, Pool(**{
+                name.lower(): value for name, value in options.items()
+            }))
+        return pool
+
+    def get_new_connection(self, conn_params):
+        # Закрывать соединение нужно в тот пул, из которого оно взято.
+        pool = self.connection_pool = self.get_pool()
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        connect = super().get_new_connection
+        raw, self.pool_created = pool.acquire(
+            lambda: connect(conn_params), self.is_raw_usable
+        )
+        return raw
+
+    def is_raw_usable(self, raw):
+        try:
+            cursor = raw.cursor()
+            cursor.execute('SELECT 1')
+            cursor.close()
+        except self.Database.Error:
+            return False
+        return True
+
+    def _close(self):
+        pool = getattr(self, 'connection_pool', None)
+        if pool is None:
+            return super()._close()
+        raw = self.connection
+        # Соединение с ошибками или посреди транзакции в пул не вернём.
+        if self.in_atomic_block or self.errors_occurred:
+            return pool.discard(raw)
+        try:
+            raw.rollback()
+        except self.Database.Error:
+            return pool.discard(raw)
+        pool.release(raw, self.pool_created)
@@ -0,0 +1,263 @@
+"""
+Лента новых комментариев к новости через Server-Sent Events.
+
+Комментарий после фиксации транзакции публикуется брокеру в тему
+новости. Брокер из настройки ``NEWS_EVENTS_BROKER`` раздаёт сообщение
+очередям подписчиков: у каждого открытого соединения своя
+``asyncio.Queue``, и ожидающее соединение стоит только корутину и
+очередь — ни потока, ни таймера, ни опроса базы: существование новости
+проверяется один раз на процесс, а keepalive рассылает общий таймер
+цикла событий. ``InMemoryBroker`` работает в
+пределах процесса. Для нескольких воркеров нужен брокер, который
+отправляет ``publish`` всем процессам (например, через Redis pub/sub) и
+в каждом из них вызывает ``fan_out`` — раздачу локальным подписчикам.
+
+Django 3.2 отдаёт потоковые ответы под ASGI синхронным перебором прямо
+в цикле событий, поэтому ленту обслуживает ``EventsApplication`` —
+обёртка над приложением Django, которая перехватывает маршрут
+``news:events``. Под WSGI этот маршрут отвечает 204, и браузер не
+переподключается.
+"""
+import asyncio
+import json
+import threading
+from collections import Counter, defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.urls import Resolver404, resolve
+from django.utils.formats import date_format
+from django.utils.module_loading import import_string
+from django.utils.timezone import localtime
+
+from .models import News
+
+RETRY_MS = 5000
+KEEPALIVE = b': keepalive\n\n'
+HEADERS = [
+    (b'content-type', b'text/event-stream; charset=utf-8'),
+    (b'cache-control', b'no-cache'),
+    (b'x-accel-buffering', b'no'),
+]
+
+stats = Counter()
+broker = None
+# Новости, для которых лента уже открывалась: волна переподключений
+# после перезапуска не должна превращаться в волну запросов к базе.
+known_news = set()
+checks = {}
+# Открытые очереди по циклам событий и таймеры keepalive для них: один
+# таймер на цикл, а не на соединение.
+listeners = defaultdict(set)
+keepalives = {}
+
+
+def deliver(queues, message):
+    """Кладёт сообщение в очереди; выполняется в цикле событий очередей."""
+    for queue in queues:
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            stats['dropped'] += 1
+        else:
+            stats['delivered'] += 1
+
+
+class InMemoryBroker:
+    """Рассылка внутри процесса, подписчики сгруппированы по циклам."""
+
+    def __init__(self, queue_size):
+        self.queue_size = queue_size
+        self.topics = defaultdict(dict)
+        self.lock = threading.Lock()
+
+    def subscribe(self, topic):
+        """Очередь новых сообщений темы; вызывается из цикла событий."""
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(self.queue_size)
+        with self.lock:
+            self.topics[topic].setdefault(loop, set()).add(queue)
+        stats['subscribers'] += 1
+        return queue
+
+    def unsubscribe(self, topic, queue):
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            loops = self.topics.get(topic, {})
+            queues = loops.get(loop, set())
+            queues.discard(queue)
+            if not queues:
+                loops.pop(loop, None)
+            if not loops:
+                self.topics.pop(topic, None)
+        stats['subscribers'] -= 1
+
+    def fan_out(self, topic, message):
+        """Раздаёт сообщение подписчикам процесса; из любого потока."""
+        with self.lock:
+            targets = [
+                (loop, tuple(queues))
+                for loop, queues in self.topics.get(topic, {}).items()
+            ]
+        for loop, queues in targets:
+            # Один вызов на цикл, а не на подписчика: call_soon_threadsafe
+            # каждый раз будит цикл через сокет.
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(deliver, queues, message)
+
+    def publish(self, topic, message):
+        stats['published'] += 1
+        self.fan_out(topic, message)
+
+
+def get_broker():
+    global broker
+    if broker is None:
+        broker = import_string(settings.NEWS_EVENTS_BROKER)(
+            settings.NEWS_EVENTS_QUEUE_SIZE
+        )
+    return broker
+
+
+def reset():
+    """Забывает брокера и счётчики, например между тестами."""
+    global broker
+    broker = None
+    stats.clear()
+    known_news.clear()
+
+
+def comments_topic(news_id):
+    return f'news:{news_id}:comments'
+
+
+def encode_comment(comment):
+    """Событие SSE; кодируется один раз для всех подписчиков."""
+    created = localtime(comment.created)
+    data = json.dumps({
+        'id': comment.pk,
+        'author': str(comment.author),
+        'created': date_format(created, 'DATETIME_FORMAT'),
+        'text': comment.text,
+    }, ensure_ascii=False)
+    return f'id: {comment.pk}\nevent: comment\ndata: {data}\n\n'.encode()
+
+
+def publish_comment(comment):
+    get_broker().publish(
+        comments_topic(comment.news_id), encode_comment(comment)
+    )
+
+
+def body(data):
+    return {'type': 'http.response.body', 'body': data, 'more_body': True}
+
+
+def wake(queue):
+    """Будит соединение после отключения клиента."""
+    if not queue.full():
+        queue.put_nowait(None)
+
+
+def keep_alive(loop):
+    queues = listeners.get(loop)
+    if not queues:
+        keepalives.pop(loop, None)
+        return
+    for queue in queues:
+        if not queue.full():
+            queue.put_nowait(KEEPALIVE)
+    keepalives[loop] = loop.call_later(
+        settings.NEWS_EVENTS_KEEPALIVE, keep_alive, loop
+    )
+
+
+def listen(queue):
+    loop = asyncio.get_running_loop()
+    listeners[loop].add(queue)
+    if loop not in keepalives:
+        keepalives[loop] = loop.call_later(
+            settings.NEWS_EVENTS_KEEPALIVE, keep_alive, loop
+        )
+
+
+def stop_listening(queue):
+    loop = asyncio.get_running_loop()
+    queues = listeners[loop]
+    queues.discard(queue)
+    if not queues:
+        del listeners[loop]
+        handle = keepalives.pop(loop, None)
+        if handle is not None:
+            handle.cancel()
+
+
+async def wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def news_exists(news_id):
+    """Проверяет новость один раз, сколько бы соединений её ни ждали."""
+    if news_id in known_news:
+        return True
+    check = checks.get(news_id)
+    if check is None:
+        check = checks[news_id] = asyncio.ensure_future(
+            sync_to_async(News.objects.filter(pk=news_id).exists)()
+        )
+        check.add_done_callback(lambda _: checks.pop(news_id, None))
+    if await asyncio.shield(check):
+        known_news.add(news_id)
+        return True
+    return False
+
+
+async def stream_comments(news_id, receive, send):
+    """Держит соединение и отдаёт комментарии новости по мере появления."""
+    if not await news_exists(news_id):
+        await send({'type': 'http.response.start', 'status': 404,
+                    'headers': [(b'content-type', b'text/plain')]})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+    topic = comments_topic(news_id)
+    events = get_broker()
+    queue = events.subscribe(topic)
+    listen(queue)
+    disconnect = asyncio.ensure_future(wait_disconnect(receive))
+    disconnect.add_done_callback(lambda _: wake(queue))
+    try:
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': HEADERS})
+        await send(body(f'retry: {RETRY_MS}\n\n'.encode()))
+        while not disconnect.done():
+            message = await queue.get()
+            if message is not None:
+                await send(body(message))
+    finally:
+        disconnect.cancel()
+        stop_listening(queue)
+        events.unsubscribe(topic, queue)
+
+
+class EventsApplication:
+    """ASGI-приложение: ленты событий обслуживает само, остальное — Django."""
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope['type'] == 'http'
+            and scope['method'] == 'GET'
+            and scope['path'].endswith('/events/')
+        ):
+            try:
+                match = resolve(scope['path'])
+            except Resolver404:
+                match = None
+            if match is not None and match.view_name == 'news:events':
+                return await stream_comments(
+                    match.kwargs['pk'], receive, send
+                )
+        return await self.application(scope, receive, send)
@@ -0,0 +1,142 @@
+"""
+Потоковая загрузка новостей из JSONL или CSV.
+
+Строки читаются, проверяются и группируются генераторами, поэтому в
+памяти одновременно лежит не больше одной пачки. Каждая пачка пишется
+в своей транзакции: новые новости через ``bulk_create``, уже известные
+по ``external_id`` — через ``bulk_update``, так что повторный запуск
+на том же файле ничего не дублирует. Строка без даты не меняет дату уже
+известной новости, а новой ставит сегодняшнюю.
+"""
+import csv
+import json
+import sys
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from news import archive, cache
+from news.models import News
+from news.search import get_backend
+
+FIELDS = ('title', 'text', 'date')
+TITLE_LENGTH = News._meta.get_field('title').max_length
+EXTERNAL_ID_LENGTH = News._meta.get_field('external_id').max_length
+
+
+def read_rows(stream, fmt):
+    """Словари для CSV, сырые непустые строки для JSONL."""
+    if fmt == 'csv':
+        return csv.DictReader(stream)
+    return (line for line in stream if line.strip())
+
+
+def clean_rows(rows, errors):
+    """Пропускает дальше только корректные строки, ошибки пишет в errors."""
+    for number, row in enumerate(rows, start=1):
+        try:
+            yield clean_row(row)
+        except (AttributeError, KeyError, TypeError, ValueError) as error:
+            errors.write(f'Строка {number}: {error!r}\n')
+
+
+def clean_row(row):
+    if isinstance(row, str):
+        row = json.loads(row)
+    external_id = str(row['external_id']).strip()
+    title = row['title'].strip()
+    text = row['text'].strip()
+    if not external_id or len(external_id) > EXTERNAL_ID_LENGTH:
+        raise ValueError('некорректный external_id')
+    if not title or len(title) > TITLE_LENGTH:
+        raise ValueError('некорректный заголовок')
+    if not text:
+        raise ValueError('пустой текст')
+    # Без даты в строке date остаётся None до save_batch.
+    news = News(external_id=external_id, title=title, text=text, date=None)
+    if row.get('date'):
+        news.date = parse_date(row['date'])
+        if news.date is None:
+            raise ValueError('некорректная дата')
+    return news
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def save_batch(batch):
+    """Вставляет новые и обновляет известные новости пачки."""
+    # Повтор external_id внутри пачки: остаётся последняя версия.
+    by_id = {news.external_id: news for news in batch}
+    with transaction.atomic():
+        existing = News.objects.in_bulk(
+            list(by_id), field_name='external_id'
+        )
+        updated = []
+        for external_id, news in existing.items():
+            fresh = by_id.pop(external_id)
+            for field in FIELDS:
+                if getattr(fresh, field) is not None:
+                    setattr(news, field, getattr(fresh, field))
+            updated.append(news)
+        for news in by_id.values():
+            if news.date is None:
+                news.date = News._meta.get_field('date').get_default()
+        News.objects.bulk_update(updated, FIELDS)
+        News.objects.bulk_create(by_id.values())
+        # bulk-операции не шлют сигналы: обновляем поиск и кэш сами.
+        saved = News.objects.filter(
+            external_id__in=[news.external_id for news in batch]
+        )
+        get_backend().index_many(News, saved)
+    for news in updated:
+        cache.invalidate(news.pk)
+    archive.invalidate()
+    return len(by_id), len(updated)
+
+
+class Command(BaseCommand):
+    help = 'Загружает новости из JSONL или CSV (файл или «-» для stdin).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу или «-».')
+        parser.add_argument(
+            '--format', choices=('jsonl', 'csv'),
+            help='По умолчанию определяется по расширению файла.'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl'
+        )
+        if options['batch_size'] < 1:
+            raise CommandError('Размер пачки должен быть положительным.')
+        stream = (
+            sys.stdin if path == '-'
+            else open(path, encoding='utf-8', newline='')
+        )
+        created = updated = 0
+        started = time.perf_counter()
+        try:
+            rows = clean_rows(read_rows(stream, fmt), self.stderr)
+            for batch in batched(rows, options['batch_size']):
+                batch_created, batch_updated = save_batch(batch)
+                created += batch_created
+                updated += batch_updated
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        elapsed = time.perf_counter() - started
+        total = created + updated
+        self.stdout.write(
+            f'Создано: {created}, обновлено: {updated}, '
+            f'{total / elapsed if elapsed else 0:.0f} строк/с'
+        )
@@ -0,0 +1,72 @@
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client, override_settings
+
+from news import urls
+from news.benchmarks import compare_urls, measure_urls, url_requests
+from news.models import Comment, News
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет все маршруты news.urls через тестовый клиент и '
+        'сравнивает перцентили и число запросов с базовой линией.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Запросов на маршрут.')
+        parser.add_argument('--save', help='Записать результат в JSON.')
+        parser.add_argument('--baseline', help='JSON прошлого прогона.')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Допустимый рост медианы, доля.')
+
+    def handle(self, *args, **options):
+        if not News.objects.exists():
+            raise CommandError('База пуста, сначала запустите seed.')
+        data = {'news': News.objects.count(),
+                'comments': Comment.objects.count()}
+        with transaction.atomic():
+            user = get_user_model().objects.create(
+                username='loadtest', is_staff=True
+            )
+            client = Client()
+            client.force_login(user)
+            requests = url_requests(user)
+            missing = {
+                f'{urls.app_name}:{pattern.name}'
+                for pattern in urls.urlpatterns
+            } - set(requests)
+            if missing:
+                raise CommandError(
+                    f'Нет запроса для маршрутов: {", ".join(sorted(missing))}'
+                )
+            # Вне тестового раннера хост тестового клиента не разрешён.
+            with override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']
+            ):
+                rows = measure_urls(client, requests, options['requests'])
+            transaction.set_rollback(True)
+        for name, row in rows.items():
+            self.stdout.write(f'{name}  ' + '  '.join(
+                f'{key}={value}' for key, value in row.items()
+            ))
+        if options['save']:
+            with open(options['save'], 'w', encoding='utf-8') as file:
+                json.dump({'data': data, 'urls': rows}, file, indent=2)
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)
+            if baseline['data'] != data:
+                self.stderr.write(
+                    f'Данные отличаются от базовых: {baseline["data"]}'
+                )
+            regressions = compare_urls(
+                baseline['urls'], rows, options['tolerance']
+            )
+            if regressions:
+                raise CommandError('\n'.join(regressions))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from news.models import Comment, News
+from news.search import get_backend
+
+CHUNK_SIZE = 2000
+
+
+class Command(BaseCommand):
+    help = 'Заново индексирует новости и комментарии для поиска.'
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        for model in (News, Comment):
+            chunk = []
+            total = 0
+            with transaction.atomic():
+                backend.clear(model)
+                for obj in model.objects.iterator(chunk_size=CHUNK_SIZE):
+                    chunk.append(obj)
+                    if len(chunk) == CHUNK_SIZE:
+                        backend.index_many(model, chunk)
+                        total += len(chunk)
+                        chunk = []
+                backend.index_many(model, chunk)
+                total += len(chunk)
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: {total}'
+            )
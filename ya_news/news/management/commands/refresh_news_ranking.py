@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from news import ranking
+
+
+class Command(BaseCommand):
+    help = 'Обновляет рейтинг новостей для главной страницы.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Пересчитать рейтинг заново, например после удаления '
+                 'комментариев или смены NEWS_RANKING.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=ranking.BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        added, processed = ranking.refresh(
+            full=options['full'], batch_size=options['batch_size']
+        )
+        self.stdout.write(
+            f'Новостей добавлено: {added}, комментариев учтено: '
+            f'{processed}, {ranking.stats["last_ms"]} мс'
+        )
@@ -0,0 +1,176 @@
+"""
+Воспроизводимые синтетические данные для нагрузочных замеров.
+
+Один и тот же ``--seed`` даёт тех же пользователей, те же новости и
+комментарии. Первичные ключи назначаются заранее, поэтому новости и
+комментарии пишутся пачками через ``executemany`` в обход ORM и без
+чтения обратно, в поиск индексируются те же строки, а в памяти
+одновременно лежит не больше одной пачки — так можно набрать десятки
+миллионов строк. Сигналы при этом не срабатывают. Ключи берутся после текущего
+максимума: параллельные вставки во время работы команды недопустимы.
+"""
+import random
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta, timezone
+from itertools import count, islice
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+
+from news import cache
+from news.benchmarks import random_words
+from news.models import Comment, News
+from news.search import get_backend
+
+EPOCH = date(2024, 1, 1)
+DAYS = 3650
+DAY = 24 * 60 * 60
+VOCABULARY_SIZE = 5000
+TITLE_LENGTH = News._meta.get_field('title').max_length
+
+# Строки вставки; поиск индексирует их так же, как модели: по pk и полям.
+NewsRow = namedtuple('NewsRow', 'pk external_id title text date')
+CommentRow = namedtuple('CommentRow', 'pk news_id author_id text created')
+
+
+def next_id(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+def insert(cursor, model, fields, rows):
+    """Пачка строк одним executemany: без моделей и компилятора ORM."""
+    quote = connection.ops.quote_name
+    columns = ', '.join(
+        quote((model._meta.pk if name == 'pk' else
+               model._meta.get_field(name)).column)
+        for name in fields
+    )
+    cursor.executemany(
+        f'INSERT INTO {quote(model._meta.db_table)} ({columns}) '
+        f'VALUES ({", ".join(["%s"] * len(fields))})',
+        list(rows),
+    )
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'Заполняет базу воспроизводимыми синтетическими данными.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--news', type=int, default=1000)
+        parser.add_argument('--comments-per-news', type=int, default=10)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--password', default='password',
+            help='Пароль всех созданных пользователей.'
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['batch_size'] < 1:
+            raise CommandError(
+                'Нужны хотя бы один пользователь и положительная пачка.'
+            )
+        self.rng = random.Random(options['seed'])
+        self.vocabulary = random_words(self.rng, VOCABULARY_SIZE)
+        self.batch_size = options['batch_size']
+        self.prefix = f'seed{options["seed"]}-'
+        User = get_user_model()
+        if User.objects.filter(username__startswith=self.prefix).exists():
+            raise CommandError(
+                f'Данные с --seed {options["seed"]} уже есть в базе.'
+            )
+        started = perf_counter()
+        user_ids = self.create_users(options['users'], options['password'])
+        news, comments = self.create_news(
+            options['news'], options['comments_per_news'], user_ids
+        )
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                no_style(), [User, News, Comment]
+            ):
+                cursor.execute(sql)
+        # Ключи могли совпасть с удалёнными ранее новостями.
+        cache.get_cache().clear()
+        elapsed = perf_counter() - started
+        total = len(user_ids) + news + comments
+        self.stdout.write(
+            f'Пользователей: {len(user_ids)}, новостей: {news}, '
+            f'комментариев: {comments}, '
+            f'{total / elapsed if elapsed else 0:.0f} строк/с'
+        )
+
+    def sentence(self, low, high):
+        return ' '.join(
+            self.rng.choices(self.vocabulary, k=self.rng.randint(low, high))
+        )
+
+    def create_users(self, number, password):
+        User = get_user_model()
+        first = next_id(User)
+        # Хэш пароля считается один раз: он намеренно медленный.
+        password = make_password(password)
+        users = (
+            User(id=first + index, username=f'{self.prefix}{index}',
+                 password=password)
+            for index in range(number)
+        )
+        for batch in batched(users, self.batch_size):
+            User.objects.bulk_create(batch)
+        return range(first, first + number)
+
+    def create_news(self, number, comments_per_news, user_ids):
+        backend = get_backend()
+        news_ids = count(next_id(News))
+        comment_ids = count(next_id(Comment))
+        ops = connection.ops
+        created = 0
+        for start in range(0, number, self.batch_size):
+            stop = min(start + self.batch_size, number)
+            news = [
+                NewsRow(
+                    next(news_ids),
+                    f'{self.prefix}{index}',
+                    self.sentence(2, 5)[:TITLE_LENGTH],
+                    self.sentence(20, 60),
+                    EPOCH - timedelta(days=self.rng.randrange(DAYS)),
+                )
+                for index in range(start, stop)
+            ]
+            with transaction.atomic(), connection.cursor() as cursor:
+                insert(cursor, News, NewsRow._fields, (
+                    row._replace(date=ops.adapt_datefield_value(row.date))
+                    for row in news
+                ))
+                backend.index_many(News, news)
+            comments = (
+                CommentRow(
+                    next(comment_ids),
+                    item.pk,
+                    self.rng.choice(user_ids),
+                    self.sentence(5, 30),
+                    ops.adapt_datetimefield_value(
+                        datetime.combine(item.date, time.min, timezone.utc)
+                        + timedelta(seconds=self.rng.randrange(DAY))
+                    ),
+                )
+                for item in news
+                for _ in range(comments_per_news)
+            )
+            for batch in batched(comments, self.batch_size):
+                with transaction.atomic(), connection.cursor() as cursor:
+                    insert(cursor, Comment, CommentRow._fields, batch)
+                    backend.index_many(Comment, batch)
+                created += len(batch)
+        return number, created
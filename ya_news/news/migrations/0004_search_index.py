@@ -0,0 +1,55 @@
+from django.db import migrations
+
+SQLITE_CREATE = (
+    'CREATE VIRTUAL TABLE news_news_fts USING fts5(title, text)',
+    'CREATE VIRTUAL TABLE news_comment_fts USING fts5(text)',
+)
+POSTGRES_CREATE = (
+    'CREATE TABLE news_news_search ('
+    'object_id bigint PRIMARY KEY REFERENCES news_news (id) '
+    'ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, '
+    'document tsvector NOT NULL)',
+    'CREATE INDEX news_news_search_document_idx '
+    'ON news_news_search USING GIN (document)',
+    'CREATE TABLE news_comment_search ('
+    'object_id bigint PRIMARY KEY REFERENCES news_comment (id) '
+    'ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, '
+    'document tsvector NOT NULL)',
+    'CREATE INDEX news_comment_search_document_idx '
+    'ON news_comment_search USING GIN (document)',
+)
+DROP = {
+    'sqlite': (
+        'DROP TABLE news_news_fts',
+        'DROP TABLE news_comment_fts',
+    ),
+    'postgresql': (
+        'DROP TABLE news_news_search',
+        'DROP TABLE news_comment_search',
+    ),
+}
+
+
+def create_search_index(apps, schema_editor):
+    statements = {
+        'sqlite': SQLITE_CREATE,
+        'postgresql': POSTGRES_CREATE,
+    }.get(schema_editor.connection.vendor, ())
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    for statement in DROP.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0003_bannedword'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.2.15 on 2026-10-18 18:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0005_news_external_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NewsRanking',
+            fields=[
+                ('news', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ranking', serialize=False, to='news.news')),
+                ('score', models.FloatField()),
+                ('last_comment_id', models.BigIntegerField(db_index=True, default=0)),
+            ],
+            options={
+                'verbose_name': 'Рейтинг новости',
+                'verbose_name_plural': 'Рейтинги новостей',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='newsranking',
+            index=models.Index(fields=['-score', '-news'], name='newsranking_score_idx'),
+        ),
+    ]
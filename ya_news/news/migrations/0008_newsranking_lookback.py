@@ -0,0 +1,45 @@
+# Generated by Django 3.2.15 on 2026-10-18 19:15
+
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_base(apps, schema_editor):
+    """До окна все учтённые комментарии уже окончательные."""
+    NewsRanking = apps.get_model('news', 'NewsRanking')
+    Comment = apps.get_model('news', 'Comment')
+    counted = Comment.objects.filter(
+        news=OuterRef('news'), pk__lte=OuterRef('last_comment_id')
+    ).order_by().values('news').annotate(count=Count('pk')).values('count')
+    rankings = NewsRanking.objects.using(schema_editor.connection.alias)
+    rankings.update(
+        base_score=F('score'), base_count=Coalesce(Subquery(counted), 0)
+    )
+    rankings.update(comment_count=F('base_count'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0007_news_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='newsranking',
+            name='base_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='newsranking',
+            name='base_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='newsranking',
+            name='comment_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(fill_base, migrations.RunPython.noop),
+    ]
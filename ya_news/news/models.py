@@ -8,9 +8,15 @@ class News(models.Model):
     title = models.CharField(max_length=50)
     text = models.TextField()
     date = models.DateField(default=datetime.today)
+    external_id = models.CharField(
+        max_length=100, unique=True, null=True, blank=True
+    )
 
     class Meta:
-        ordering = ('-date',)
+        ordering = ('-date', '-id')
+        indexes = (
+            models.Index(fields=('date', 'id'), name='news_date_id_idx'),
+        )
         verbose_name_plural = 'Новости'
         verbose_name = 'Новость'
 
@@ -32,6 +38,54 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ('created',)
+        indexes = (
+            models.Index(
+                fields=('news', 'created', 'id'),
+                name='comment_news_created_id_idx',
+            ),
+        )
 
     def __str__(self):
         return self.text[:50]
+
+
+class NewsRanking(models.Model):
+    """Рейтинг новости для главной, см. news/ranking.py."""
+    news = models.OneToOneField(
+        News,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='ranking',
+    )
+    score = models.FloatField()
+    # Комментарии с id не больше last_comment_id окончательно учтены в
+    # base_score и base_count; более новые входят только в score и
+    # comment_count и пересчитываются при каждом обновлении.
+    last_comment_id = models.BigIntegerField(default=0, db_index=True)
+    base_score = models.FloatField(default=0)
+    base_count = models.IntegerField(default=0)
+    comment_count = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=('-score', '-news'), name='newsranking_score_idx'
+            ),
+        )
+        verbose_name_plural = 'Рейтинги новостей'
+        verbose_name = 'Рейтинг новости'
+
+    def __str__(self):
+        return f'{self.news_id}: {self.score:.3f}'
+
+
+class BannedWord(models.Model):
+    word = models.CharField('Слово', max_length=100, unique=True)
+
+    class Meta:
+        ordering = ('word',)
+        verbose_name_plural = 'Запрещённые слова'
+        verbose_name = 'Запрещённое слово'
+
+    def __str__(self):
+        return self.word
@@ -0,0 +1,61 @@
+"""Курсорная (keyset) пагинация комментариев.
+
+Страница выбирается условием по паре ``(created, id)``, а не смещением,
+поэтому запрос к любой странице идёт по индексу
+``(news_id, created, id)`` и стоит столько же, сколько первая. Автор
+комментария загружается только идентификатором и именем: ленте не нужны
+хэш пароля и остальные колонки пользователя.
+"""
+from datetime import datetime, timedelta, timezone
+
+from django.db.models import Q
+
+from .models import Comment
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+COMMENT_FIELDS = ('news', 'author', 'text', 'created', 'author__username')
+# Наибольший целый ключ, который принимает SQLite.
+MAX_ID = 2 ** 63 - 1
+
+
+def encode_cursor(comment):
+    """Курсор вида ``<микросекунды с эпохи>-<id>``, безопасный для URL."""
+    return f'{(comment.created - EPOCH) // MICROSECOND}-{comment.pk}'
+
+
+def parse_id(value):
+    """Целый ключ из строки; вне диапазона ключей базы — ValueError."""
+    pk = int(value)
+    if not 0 < pk <= MAX_ID:
+        raise ValueError(f'Ключ вне допустимого диапазона: {value}')
+    return pk
+
+
+def decode_cursor(cursor):
+    """Разбирает курсор; для некорректного значения бросает ValueError."""
+    microseconds, pk = cursor.split('-')
+    try:
+        created = EPOCH + int(microseconds) * MICROSECOND
+    except OverflowError:
+        raise ValueError(f'Время курсора вне диапазона: {microseconds}')
+    return created, parse_id(pk)
+
+
+def get_comments_page(news_id, size, cursor=None):
+    """Возвращает комментарии страницы и курсор следующей (или None)."""
+    comments = Comment.objects.filter(
+        news_id=news_id
+    ).select_related('author').only(*COMMENT_FIELDS).order_by(
+        'created', 'id'
+    )
+    if cursor:
+        created, pk = decode_cursor(cursor)
+        comments = comments.filter(
+            Q(created__gt=created) | Q(id__gt=pk),
+            created__gte=created,
+        )
+    page = list(comments[:size + 1])
+    if len(page) > size:
+        return page[:size], encode_cursor(page[size - 1])
+    return page, None
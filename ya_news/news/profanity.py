@@ -0,0 +1,162 @@
+"""
+Поиск запрещённых слов в тексте комментариев.
+
+Слова хранятся в модели ``BannedWord``. Каждый процесс держит
+собранный движок у себя и сверяет его версию с меткой в общем кэше:
+изменение списка в админке после коммита меняет метку, и процессы
+пересобирают движок при следующей проверке, а не обращаются к базе на
+каждый комментарий. Пересборка большого списка занимает секунды,
+поэтому идёт в фоновом потоке: запрос лишь читает слова из базы, а до
+готовности нового движка проверки выполняет прежний. Синхронно движок
+собирается только первый раз в процессе — его прогревает ``warm_up``
+при старте. Движок выбирается настройкой ``NEWS_PROFANITY_ENGINE``:
+это класс, который принимает набор слов и умеет ``search(text)``,
+возвращая найденное слово или None.
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError
+from django.utils.module_loading import import_string
+
+from .models import BannedWord
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'news:banned_words:version'
+
+# Латинские буквы и цифры, которыми подменяют похожие кириллические.
+HOMOGLYPHS = str.maketrans({
+    'a': 'а', 'b': 'в', 'c': 'с', 'e': 'е', 'h': 'н', 'k': 'к', 'm': 'м',
+    'o': 'о', 'p': 'р', 't': 'т', 'x': 'х', 'y': 'у', '3': 'з', '0': 'о',
+    'ё': 'е',
+})
+
+
+def normalize(text):
+    """Приводит текст к нижнему регистру и кириллическим буквам."""
+    return text.lower().translate(HOMOGLYPHS)
+
+
+def trie_to_pattern(node):
+    """Собирает регулярное выражение из префиксного дерева слов."""
+    branches = [
+        re.escape(char) + trie_to_pattern(child)
+        for char, child in sorted(node.items()) if char
+    ]
+    if not branches:
+        return ''
+    if len(branches) == 1 and '' not in node:
+        return branches[0]
+    pattern = '(?:' + '|'.join(branches) + ')'
+    return pattern + '?' if '' in node else pattern
+
+
+class RegexEngine:
+    """
+    Одно скомпилированное выражение для всех слов.
+
+    Альтернативы сгруппированы по общим префиксам, поэтому на каждой
+    позиции текста проверяется только подходящая ветка, а не весь
+    список. Слово ищется с начала слова текста, окончание может быть
+    любым: «негодяйство» найдётся, «бредиска» — нет.
+    """
+
+    def __init__(self, words):
+        trie = {}
+        for word in {normalize(word.strip()) for word in words}:
+            if not word:
+                continue
+            node = trie
+            for char in word:
+                node = node.setdefault(char, {})
+            node[''] = {}
+        pattern = trie_to_pattern(trie)
+        self.regex = re.compile(rf'(?<!\w){pattern}') if pattern else None
+
+    def search(self, text):
+        if self.regex is None:
+            return None
+        match = self.regex.search(normalize(text))
+        return match.group() if match else None
+
+
+# Версия и движок меняются одним присваиванием, без блокировок.
+current = (None, None)
+# Поток фоновой пересборки.
+building = None
+building_lock = threading.Lock()
+stats = Counter(rebuilds=0, last_rebuild_ms=0, total_rebuild_ms=0)
+
+
+def get_cache():
+    return caches[settings.NEWS_BANNED_WORDS_CACHE]
+
+
+def bump_version():
+    """Помечает список слов изменённым для всех процессов."""
+    get_cache().set(VERSION_KEY, uuid4().hex, None)
+
+
+def load_words():
+    return list(BannedWord.objects.values_list('word', flat=True))
+
+
+def build(version, words):
+    global current
+    started = time.perf_counter()
+    engine = import_string(settings.NEWS_PROFANITY_ENGINE)(words)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    current = (version, engine)
+    stats['rebuilds'] += 1
+    stats['last_rebuild_ms'] = round(elapsed_ms, 2)
+    stats['total_rebuild_ms'] += round(elapsed_ms, 2)
+    return engine
+
+
+def rebuild(version, words):
+    try:
+        build(version, words)
+    except Exception:
+        stats['errors'] += 1
+        logger.exception('Не удалось пересобрать запрещённые слова.')
+
+
+def start_rebuild(version):
+    """Запускает фоновую пересборку, если она ещё не идёт."""
+    global building
+    with building_lock:
+        if building is None or not building.is_alive():
+            # Слова читаются здесь, в соединении и транзакции запроса.
+            building = threading.Thread(
+                target=rebuild, args=(version, load_words()),
+                name='banned-words', daemon=True,
+            )
+            building.start()
+        return building
+
+
+def get_engine():
+    """Движок для текущего списка слов; новый собирается в фоне."""
+    version = get_cache().get_or_set(VERSION_KEY, uuid4().hex, None)
+    current_version, engine = current
+    if version == current_version:
+        return engine
+    if engine is None:
+        return build(version, load_words())
+    start_rebuild(version)
+    return engine
+
+
+def warm_up():
+    """Собирает движок при старте процесса, до первого комментария."""
+    try:
+        get_engine()
+    except DatabaseError:
+        logger.warning('Запрещённые слова не загружены: нет базы.')
@@ -1,27 +1,59 @@
 import pytest
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.urls import reverse
 from django.test import Client
 from django.utils import timezone
 from django.utils.timezone import timedelta
 
+from news import events, ratelimit, testing
 from news.models import Comment, News
 from news.pytest_tests.constans import COMMENT_TEXT
 
 
+if getattr(settings, 'TEST_DATABASE_TEMPLATE_DIR', None):
+    @pytest.fixture(scope='session')
+    def django_db_setup(django_test_environment, django_db_blocker):
+        """Тестовая база из шаблона вместо миграций, см. news/testing.py."""
+        with django_db_blocker.unblock():
+            testing.restore_template(
+                testing.build_template(settings.TEST_DATABASE_TEMPLATE_DIR)
+            )
+        yield
+
+
+def session_user(django_db_blocker, username):
+    """
+    Пользователь на весь прогон: создаётся один раз вне транзакций тестов.
+
+    Такие фикстуры неизменяемы — тесты не должны их сохранять, а тесты
+    с ``transaction=True`` очистили бы их вместе с базой.
+    """
+    with django_db_blocker.unblock():
+        return get_user_model().objects.create(username=username)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    ratelimit.reset()
+    events.reset()
+
+
 @pytest.fixture
 def news():
     return News.objects.create(title='Заголовок', text='Текст')
 
 
-@pytest.fixture
-def author(django_user_model):
-    return django_user_model.objects.create(username='Лев Толстой')
+@pytest.fixture(scope='session')
+def author(django_db_setup, django_db_blocker):
+    return session_user(django_db_blocker, 'Лев Толстой')
 
 
-@pytest.fixture
-def reader(django_user_model):
-    return django_user_model.objects.create(username='Читатель простой')
+@pytest.fixture(scope='session')
+def reader(django_db_setup, django_db_blocker):
+    return session_user(django_db_blocker, 'Читатель простой')
 
 
 @pytest.fixture
@@ -65,9 +97,9 @@ def url(news):
     return reverse('news:detail', args=(news.id,))
 
 
-@pytest.fixture
-def user(django_user_model):
-    return django_user_model.objects.create(username='Мимо Крокодил')
+@pytest.fixture(scope='session')
+def user(django_db_setup, django_db_blocker):
+    return session_user(django_db_blocker, 'Мимо Крокодил')
 
 
 @pytest.fixture
@@ -1,6 +1,5 @@
-from news.forms import BAD_WORDS
-
 COMMENT_TEXT = 'Текст комментария'
 FORM_DATA = {'text': COMMENT_TEXT}
 NEW_FORM_DATA = {'text': 'Обновленный комментарий'}
-BAD_WORDS_DATA = {'text': f'Какой-то текст, {BAD_WORDS[0]}, еще текст'}
+BAD_WORD = 'редиска'
+BAD_WORDS_DATA = {'text': f'Какой-то текст, {BAD_WORD}, еще текст'}
@@ -1,9 +1,22 @@
+import csv
+import gzip
+import io
+import json
+import time
+from datetime import date
+
 import pytest
+from asgiref.sync import async_to_sync
 from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.http import Http404
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils.http import http_date
 
 from news.models import Comment, News
-from news import forms
+from news import archive, async_views, cache, forms
 
 
 @pytest.mark.django_db
@@ -25,6 +38,37 @@ def test_news_order(client, create_news):
     assert all_dates == sorted_dates
 
 
+@pytest.mark.django_db
+def test_home_page_comment_count(client, create_comments,
+                                 django_assert_num_queries):
+    url = reverse('news:home')
+    with django_assert_num_queries(2):
+        response = client.get(url)
+    news = response.context['object_list'][0]
+    assert news.comment_count == 2
+    assert 'Комментариев: 2' in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_home_page_fragments_are_cached(
+        client, news, comment, django_capture_on_commit_callbacks):
+    url = reverse('news:home')
+    client.get(url)
+    hits = cache.stats['hits']
+    client.get(url)
+    assert cache.stats['hits'] == hits + 1
+    versions = cache.get_versions([news.pk])
+    news.title = 'Новый заголовок'
+    with django_capture_on_commit_callbacks(execute=True):
+        news.save()
+        # Версия меняется только после коммита.
+        assert cache.get_versions([news.pk]) == versions
+    assert news.title in client.get(url).content.decode()
+    with django_capture_on_commit_callbacks(execute=True):
+        Comment.objects.create(news=news, author=comment.author, text='Ещё')
+    assert 'Комментариев: 2' in client.get(url).content.decode()
+
+
 @pytest.mark.django_db
 def test_detail_page(client, create_comments):
     news = News.objects.first()
@@ -38,6 +82,174 @@ def test_detail_page(client, create_comments):
     assert sorted_comments == list(comments)
 
 
+@pytest.mark.django_db
+def test_detail_page_comments_are_paginated(client, settings,
+                                            create_comments):
+    settings.COMMENTS_COUNT_ON_DETAIL_PAGE = 1
+    news = News.objects.first()
+    first, second = Comment.objects.order_by('created')
+    response = client.get(reverse('news:detail', args=(news.id,)))
+    assert response.context['comments'] == [first]
+    next_cursor = response.context['next_cursor']
+    response = client.get(
+        reverse('news:comments', args=(news.id,)),
+        {'after': next_cursor, 'format': 'json'},
+    )
+    data = response.json()
+    assert second.text in data['html']
+    assert first.text not in data['html']
+    assert data['next'] is None
+
+
+@pytest.mark.django_db
+def test_detail_page_loads_only_author_name(client, reader_client, comment):
+    url = reverse('news:detail', args=(comment.news_id,))
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    assert 'password' not in ' '.join(query['sql'] for query in queries)
+    assert comment.author.username in response.content.decode()
+    response = reader_client.get(url)
+    assert 'Редактировать' not in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_archive_pages_through_a_date_bucket(client, settings):
+    settings.NEWS_ARCHIVE_PAGE_SIZE = 2
+    days = (date(2024, 5, 17),) * 3 + (date(2024, 5, 2), date(2024, 6, 1))
+    for index, day in enumerate(days):
+        News.objects.create(title=f'Новость {index}', text='Текст', date=day)
+    response = client.get(reverse('news:archive_year', args=(2024,)))
+    assert response.context['periods'] == [
+        (date(2024, 5, 1), 4), (date(2024, 6, 1), 1)
+    ]
+    url = reverse('news:archive_month', args=(2024, 5))
+    seen = []
+    cursor = None
+    while True:
+        response = client.get(url, {'after': cursor} if cursor else {})
+        seen += response.context['news_list']
+        cursor = response.context['next_cursor']
+        if cursor is None:
+            break
+    assert seen == list(
+        News.objects.filter(date__month=5).order_by('-date', '-id')
+    )
+    assert response.context['periods'] == [
+        (date(2024, 5, 2), 1), (date(2024, 5, 17), 3)
+    ]
+    response = client.get(reverse('news:archive_day', args=(2024, 5, 17)))
+    assert len(response.context['news_list']) == 2
+    assert 'periods' not in response.context
+
+
+@pytest.mark.django_db
+def test_archive_counts_are_cached_until_news_change(
+        client, django_capture_on_commit_callbacks):
+    url = reverse('news:archive')
+    News.objects.create(title='Первая', text='Текст', date=date(2023, 1, 1))
+    client.get(url)
+    client.get(url)
+    assert archive.stats['hits'] >= 1
+    with django_capture_on_commit_callbacks(execute=True):
+        News.objects.create(
+            title='Вторая', text='Текст', date=date(2024, 1, 1)
+        )
+    response = client.get(url)
+    assert response.context['periods'] == [
+        (date(2023, 1, 1), 1), (date(2024, 1, 1), 1)
+    ]
+
+
+@pytest.mark.django_db
+def test_comments_page_rejects_bad_cursor(client, news):
+    url = reverse('news:comments', args=(news.id,))
+    response = client.get(url, {'after': 'not-a-cursor'})
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('cursor', (f'{10 ** 30}-1', f'1-{10 ** 30}'))
+def test_comments_page_rejects_oversized_cursor(client, news, cursor):
+    url = reverse('news:comments', args=(news.id,))
+    response = client.get(url, {'after': cursor})
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_search_finds_word_forms(client, news, comment):
+    in_title = News.objects.create(title='Тексты недели', text='Обзор')
+    response = client.get(reverse('news:search'), {'q': 'текстами'})
+    assert response.context['news_list'] == [in_title, news]
+    response = client.get(reverse('news:search'), {'q': 'комментарии'})
+    assert response.context['comments'] == [comment]
+    comment.delete()
+    response = client.get(reverse('news:search'), {'q': 'комментарии'})
+    assert response.context['comments'] == []
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('name', ('news:home', 'news:detail'))
+def test_matching_etag_returns_not_modified(
+        client, comment, name, django_assert_num_queries,
+        django_capture_on_commit_callbacks):
+    args = (comment.news_id,) if name == 'news:detail' else None
+    url = reverse(name, args=args)
+    etag = client.get(url)['ETag']
+    with django_assert_num_queries(1):
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    comment.text = 'Исправленный текст'
+    with django_capture_on_commit_callbacks(execute=True):
+        comment.save()
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('name', ('news:home', 'news:detail'))
+def test_if_modified_since_alone_does_not_hide_changes(
+        client, comment, name, django_capture_on_commit_callbacks):
+    args = (comment.news_id,) if name == 'news:detail' else None
+    url = reverse(name, args=args)
+    response = client.get(url)
+    assert 'Last-Modified' not in response
+    # Время заведомо позже любых изменений на странице.
+    since = http_date(time.time() + 3600)
+    comment.text = 'Исправленный текст'
+    with django_capture_on_commit_callbacks(execute=True):
+        comment.save()
+    response = client.get(url, HTTP_IF_MODIFIED_SINCE=since)
+    assert response.status_code == 200
+    with django_capture_on_commit_callbacks(execute=True):
+        comment.delete()
+    response = client.get(url, HTTP_IF_MODIFIED_SINCE=since)
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_etag_differs_for_comment_author(client, author_client, comment):
+    url = reverse('news:detail', args=(comment.news_id,))
+    etag = client.get(url)['ETag']
+    response = author_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert 'Редактировать' in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_etag_changes_after_login_again(client, django_user_model, news):
+    user = django_user_model.objects.create_user('Повторный', password='pw')
+    credentials = {'username': user.username, 'password': 'pw'}
+    url = reverse('news:detail', args=(news.id,))
+    client.post(reverse('users:login'), credentials)
+    etag = client.get(url)['ETag']
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+    client.get(reverse('users:logout'))
+    client.post(reverse('users:login'), credentials)
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+
+
 @pytest.mark.django_db
 def test_anonymous_client_has_no_form(client, create_comments):
     news = News.objects.first()
@@ -56,3 +268,49 @@ def test_authorized_client_has_form(client, create_comments):
     response = client.get(url)
     assert 'form' in response.context
     assert isinstance(response.context['form'], forms.CommentForm)
+
+
+@pytest.mark.django_db
+def test_comments_export_streams_for_staff(admin_client, author_client,
+                                           comment):
+    url = reverse('news:comments_export')
+    assert author_client.get(url).status_code == 403
+    response = admin_client.get(url, {'news': comment.news_id})
+    assert response.streaming
+    [row] = map(json.loads,
+                b''.join(response.streaming_content).splitlines())
+    assert row['id'] == comment.id
+    assert row['author__username'] == comment.author.username
+    response = admin_client.get(url, {'format': 'csv'},
+                                HTTP_ACCEPT_ENCODING='gzip')
+    assert response['Content-Encoding'] == 'gzip'
+    content = gzip.decompress(b''.join(response.streaming_content))
+    rows = list(csv.DictReader(io.StringIO(content.decode())))
+    assert rows[0]['text'] == comment.text
+    for news in ('abc', str(10 ** 30)):
+        response = admin_client.get(url, {'news': news})
+        assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_async_views_match_sync_pages(rf, client, create_news, comment):
+    def get(view, pk=None, **headers):
+        request = rf.get('/', **headers)
+        request.user = AnonymousUser()
+        kwargs = {} if pk is None else {'pk': pk}
+        return async_to_sync(view)(request, **kwargs)
+
+    home = client.get(reverse('news:home'))
+    response = get(async_views.news_list)
+    assert response.content == home.content
+    assert response['ETag'] == home['ETag']
+    response = get(async_views.news_list, HTTP_IF_NONE_MATCH=home['ETag'])
+    assert response.status_code == 304
+
+    detail = client.get(reverse('news:detail', args=(comment.news_id,)))
+    response = async_to_sync(async_views.news_detail)(
+        detail.wsgi_request, pk=comment.news_id
+    )
+    assert comment.text in response.content.decode()
+    with pytest.raises(Http404):
+        get(async_views.news_detail, pk=0)
@@ -0,0 +1,77 @@
+from http import HTTPStatus
+
+import pytest
+from django.template import engines
+from django.urls import reverse
+
+from news import rendering
+from news.instrumentation import (
+    Histogram, RollingHistogram, collector, template_collector
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_collector():
+    collector.clear()
+    template_collector.clear()
+
+
+def test_histogram_percentiles_within_ten_percent():
+    histogram = Histogram()
+    for value in range(1, 1001):
+        histogram.add(value)
+    assert 500 <= histogram.percentile(0.5) <= 550
+    assert 990 <= histogram.percentile(0.99) <= 1000
+    assert len(histogram.buckets) == Histogram.SIZE
+
+
+def test_rolling_histogram_forgets_old_windows():
+    histogram = RollingHistogram(windows=2, window_seconds=10)
+    histogram.add(1, now=0)
+    histogram.add(2, now=15)
+    assert histogram.merged(now=15).count == 2
+    assert histogram.merged(now=25).count == 1
+
+
+@pytest.mark.django_db
+def test_metrics_are_available_to_staff(client, admin_client, news):
+    client.get(reverse('news:home'))
+    response = admin_client.get(reverse('news:metrics'))
+    home = response.json()['views']['news:home']
+    assert home['count'] == 1
+    assert home['queries']['max'] == 2
+    assert home['render_ms']['max'] > 0
+
+
+@pytest.mark.django_db
+def test_metrics_are_hidden_from_users(author_client):
+    response = author_client.get(reverse('news:metrics'))
+    assert response.status_code == HTTPStatus.FORBIDDEN
+
+
+@pytest.mark.django_db
+def test_query_budget_warning(client, news, settings, caplog):
+    settings.QUERY_BUDGETS = {'news:detail': 0}
+    client.get(reverse('news:detail', args=(news.id,)))
+    assert 'news:detail' in caplog.text
+
+
+@pytest.mark.django_db
+def test_render_time_is_split_by_template(client, admin_client, news):
+    client.get(reverse('news:detail', args=(news.id,)))
+    response = admin_client.get(reverse('news:metrics'))
+    templates = response.json()['templates']
+    assert templates['news/detail.html']['count'] == 1
+    assert templates['base.html']['render_ms']['max'] > 0
+
+
+def test_warm_up_compiles_every_template():
+    engine = engines['django'].engine
+    loader = engine.template_loaders[0]
+    loader.reset()
+    names = list(rendering.template_names(engine))
+    assert rendering.warm_up() == len(names)
+    assert 'news/detail.html' in loader.get_template_cache
+    assert isinstance(
+        engine.get_template('news/detail.html'), rendering.TimedTemplate
+    )
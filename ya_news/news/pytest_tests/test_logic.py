@@ -1,9 +1,25 @@
+import asyncio
+import io
+import json
+import sqlite3
+
 import pytest
 from http import HTTPStatus
 
+from asgiref.sync import async_to_sync, sync_to_async
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection
+from django.urls import reverse
 
-from news.models import Comment
+from news import (
+    benchmarks, checks, events, profanity, ranking, ratelimit, urls
+)
+from news.db import pool
+from news.models import BannedWord, Comment, News, NewsRanking
+from news.routers import ReadReplicaRouter
+from news.search import search
 from news.forms import WARNING
 from news.pytest_tests.constans import FORM_DATA, BAD_WORDS_DATA, NEW_FORM_DATA
 
@@ -42,6 +58,57 @@ def test_user_cant_use_bad_words(auth_client, url):
     assert comments_count == initial_comments_count
 
 
+@pytest.mark.django_db
+@pytest.mark.parametrize('text', (
+    'Сам ты РЕДИСКА!',
+    'Ну и рeдиска',  # Латинская «e».
+))
+def test_bad_words_are_normalized(auth_client, url, text):
+    response = auth_client.post(url, data={'text': text})
+    assert WARNING in response.context['form'].errors['text']
+    assert not Comment.objects.exists()
+
+
+@pytest.mark.django_db
+def test_bad_word_inside_other_word_is_allowed(auth_client, url):
+    response = auth_client.post(url, data={'text': 'Вот бредиска какая'})
+    assert response.status_code == HTTPStatus.FOUND
+    assert Comment.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_banned_words_are_reloaded(auth_client, url, settings,
+                                   django_capture_on_commit_callbacks):
+    settings.RATE_LIMITS = {'comment': (20, 60)}
+
+    def wait_for_rebuild():
+        if profanity.building is not None:
+            profanity.building.join()
+
+    data = {'text': 'Ты бука'}
+    with django_capture_on_commit_callbacks(execute=True):
+        word = BannedWord.objects.create(word='бука')
+    auth_client.post(url, data=data)
+    wait_for_rebuild()
+    response = auth_client.post(url, data=data)
+    assert WARNING in response.context['form'].errors['text']
+    rebuilds = profanity.stats['rebuilds']
+    auth_client.post(url, data=data)
+    assert profanity.stats['rebuilds'] == rebuilds
+    with django_capture_on_commit_callbacks(execute=True):
+        word.delete()
+        # До коммита движок собирается по прежней версии списка.
+        auth_client.post(url, data=data)
+        assert profanity.stats['rebuilds'] == rebuilds
+    # Пока новый движок собирается в фоне, проверяет прежний.
+    response = auth_client.post(url, data=data)
+    assert WARNING in response.context['form'].errors['text']
+    wait_for_rebuild()
+    assert profanity.stats['rebuilds'] == rebuilds + 1
+    response = auth_client.post(url, data=data)
+    assert response.status_code == HTTPStatus.FOUND
+
+
 @pytest.mark.django_db
 def test_author_can_delete_comment(author_client, delete_url):
     initial_comments_count = Comment.objects.count()
@@ -74,3 +141,293 @@ def test_user_cant_edit_comment_of_another_user(reader_client,
     comment = Comment.objects.last()
     assert response.status_code == HTTPStatus.NOT_FOUND
     assert comment.text != NEW_FORM_DATA['text']
+
+
+@pytest.mark.django_db
+def test_import_news_upserts_by_external_id(tmp_path):
+    path = tmp_path / 'news.jsonl'
+    rows = [
+        {'external_id': 'a', 'title': 'Первая', 'text': 'Текст'},
+        {'external_id': 'b', 'title': 'Вторая', 'text': 'Текст'},
+        {'external_id': 'c', 'title': '', 'text': 'Без заголовка'},
+    ]
+    path.write_text(
+        '\n'.join(map(json.dumps, rows)) + '\nне json\n', encoding='utf-8'
+    )
+    errors = io.StringIO()
+    call_command(
+        'import_news', str(path), batch_size=1,
+        stdout=io.StringIO(), stderr=errors,
+    )
+    assert News.objects.count() == 2
+    assert errors.getvalue().count('Строка') == 2
+    rows[0]['title'] = 'Исправленная'
+    path.write_text(json.dumps(rows[0]), encoding='utf-8')
+    call_command('import_news', str(path), stdout=io.StringIO())
+    assert News.objects.count() == 2
+    news = News.objects.get(external_id='a')
+    assert news.title == 'Исправленная'
+    assert search(News, 'исправленная', 10) == [news]
+
+
+@pytest.mark.django_db
+def test_import_news_reads_csv(tmp_path):
+    path = tmp_path / 'news.csv'
+    path.write_text(
+        'external_id,title,text,date\n1,Новость,Текст,2024-01-31\n',
+        encoding='utf-8',
+    )
+    call_command('import_news', str(path), stdout=io.StringIO())
+    news = News.objects.get(external_id='1')
+    assert news.date.isoformat() == '2024-01-31'
+
+
+@pytest.mark.django_db
+def test_import_news_keeps_date_of_row_without_date(tmp_path):
+    path = tmp_path / 'news.jsonl'
+    row = {'external_id': 'a', 'title': 'Первая', 'text': 'Текст',
+           'date': '2020-05-17'}
+    path.write_text(json.dumps(row), encoding='utf-8')
+    call_command('import_news', str(path), stdout=io.StringIO())
+    del row['date']
+    row['title'] = 'Исправленная'
+    path.write_text(json.dumps(row), encoding='utf-8')
+    call_command('import_news', str(path), stdout=io.StringIO())
+    news = News.objects.get(external_id='a')
+    assert news.title == 'Исправленная'
+    assert news.date.isoformat() == '2020-05-17'
+
+
+@pytest.mark.django_db
+def test_seed_is_reproducible():
+    def seed():
+        call_command(
+            'seed', seed=3, users=2, news=3, comments_per_news=2,
+            batch_size=2, stdout=io.StringIO(),
+        )
+        return list(Comment.objects.order_by('pk').values_list(
+            'news__title', 'author__username', 'text', 'created'
+        ))
+
+    first = seed()
+    assert len(first) == 6
+    news = News.objects.order_by('pk').first()
+    assert news in search(News, news.title.split()[0], 10)
+    User.objects.all().delete()
+    News.objects.all().delete()
+    assert seed() == first
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('lookback', (0, 2, 1000))
+def test_ranking_refresh_is_incremental(author, settings, lookback):
+    settings.NEWS_RANKING = {
+        **settings.NEWS_RANKING, 'LOOKBACK_COMMENTS': lookback
+    }
+    call_command(
+        'seed', news=4, comments_per_news=3, users=2, stdout=io.StringIO()
+    )
+    assert ranking.refresh(batch_size=5) == (4, 12)
+    news = News.objects.order_by('pk').first()
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author, text=f'Новый {index}')
+        for index in range(7)
+    )
+    assert ranking.refresh(batch_size=5) == (0, 7)
+    assert ranking.refresh() == (0, 0)
+    incremental = dict(NewsRanking.objects.values_list('news', 'score'))
+    out = io.StringIO()
+    call_command('refresh_news_ranking', full=True, stdout=out)
+    assert 'комментариев учтено: 19' in out.getvalue()
+    full = dict(NewsRanking.objects.values_list('news', 'score'))
+    assert incremental == pytest.approx(full)
+
+
+@pytest.mark.django_db
+def test_ranking_counts_comments_committed_out_of_order(author, news):
+    def comment(pk):
+        return Comment.objects.create(
+            pk=pk, news=news, author=author, text=f'Комментарий {pk}'
+        )
+
+    comment(100)
+    # Транзакция с id 101 ещё не закоммичена, 102 уже видна.
+    comment(102)
+    assert ranking.refresh() == (1, 2)
+    comment(101)
+    assert ranking.refresh() == (0, 1)
+    assert ranking.refresh() == (0, 0)
+    incremental = NewsRanking.objects.get().score
+    ranking.refresh(full=True)
+    assert NewsRanking.objects.get().score == pytest.approx(incremental)
+
+
+def test_ranking_settings_are_checked(settings):
+    assert checks.check_news_ranking(None) == []
+    settings.NEWS_RANKING = {
+        **settings.NEWS_RANKING, 'COMMENT_WEIGHT': 0,
+        'LOOKBACK_COMMENTS': -1,
+    }
+    errors = checks.check_news_ranking(None)
+    assert [error.id for error in errors] == ['news.E001', 'news.E002']
+
+
+@pytest.mark.django_db
+def test_home_follows_ranking(client, settings, author, create_news):
+    settings.NEWS_HOME_ORDERING = 'ranking'
+    oldest = News.objects.order_by('date').first()
+    Comment.objects.bulk_create(
+        Comment(news=oldest, author=author, text=f'Комментарий {index}')
+        for index in range(50)
+    )
+    ranking.refresh()
+    response = client.get(reverse('news:home'))
+    object_list = list(response.context['object_list'])
+    assert object_list[0] == oldest
+    assert object_list[0].comment_count == 50
+    assert object_list[1].comment_count == 0
+    scores = [news.ranking.score for news in object_list]
+    assert scores == sorted(scores, reverse=True)
+
+
+@pytest.mark.django_db
+def test_loadtest_flags_regressions_against_baseline(tmp_path):
+    call_command('seed', users=2, news=2, stdout=io.StringIO())
+    baseline = tmp_path / 'baseline.json'
+    call_command(
+        'loadtest', requests=2, save=str(baseline), stdout=io.StringIO()
+    )
+    data = json.loads(baseline.read_text())
+    assert set(data['urls']) == {
+        f'news:{pattern.name}' for pattern in urls.urlpatterns
+    }
+    data['urls']['news:home']['queries'] -= 1
+    baseline.write_text(json.dumps(data))
+    with pytest.raises(CommandError, match='news:home: запросов'):
+        call_command(
+            'loadtest', requests=2, baseline=str(baseline),
+            stdout=io.StringIO(),
+        )
+
+
+@pytest.mark.django_db
+def test_comment_burst_gets_429(settings, author_client, reader_client,
+                                url):
+    settings.RATE_LIMITS = {'comment': (2, 60)}
+    for _ in range(2):
+        assert author_client.post(url, data=FORM_DATA).status_code == 302
+    # Новый адрес у того же пользователя не даёт новой корзины.
+    response = author_client.post(
+        url, data=FORM_DATA, REMOTE_ADDR='10.0.0.2'
+    )
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert response['Retry-After'] == '30'
+    assert Comment.objects.count() == 2
+    assert reader_client.post(url, data=FORM_DATA).status_code == 302
+
+
+@pytest.mark.django_db
+def test_new_comment_is_pushed_to_event_stream(
+    author_client, news, url, django_capture_on_commit_callbacks
+):
+    sent = []
+
+    def post_comment():
+        with django_capture_on_commit_callbacks(execute=True):
+            author_client.post(url, data=FORM_DATA)
+
+    async def stream(path):
+        disconnected = asyncio.Event()
+
+        async def receive():
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        application = events.EventsApplication(None)
+        task = asyncio.ensure_future(application(
+            {'type': 'http', 'method': 'GET', 'path': path}, receive, send
+        ))
+        while events.stats['subscribers'] < 1:
+            await asyncio.sleep(0)
+        await sync_to_async(post_comment)()
+        while len(sent) < 3:
+            await asyncio.sleep(0)
+        disconnected.set()
+        await task
+
+    async_to_sync(stream)(reverse('news:events', args=(news.pk,)))
+    assert sent[0]['status'] == HTTPStatus.OK
+    comment = Comment.objects.get()
+    assert sent[2]['body'].startswith(f'id: {comment.pk}\n'.encode())
+    assert FORM_DATA['text'] in sent[2]['body'].decode()
+    assert events.stats['subscribers'] == 0
+
+
+def test_shared_tier_is_seen_by_other_processes():
+    def limiter():
+        return ratelimit.RateLimiter(
+            2, 10, ratelimit.LocalStore(maxsize=1), cache
+        )
+
+    first, second = limiter(), limiter()
+    assert first.hit('user', now=0) == 0
+    assert second.hit('user', now=0) == 0
+    assert first.hit('user', now=0) == 5
+    assert first.hit('user', now=5) == 0
+
+
+def test_router_reads_from_replica_outside_transactions():
+    router = ReadReplicaRouter()
+    assert router.db_for_read(News) == 'replica'
+    assert router.db_for_write(News) == 'default'
+    assert not router.allow_migrate('replica', 'news')
+
+
+@pytest.mark.django_db
+def test_migrating_another_alias_keeps_its_data_there(tmp_path):
+    words = BannedWord.objects.count()
+    benchmarks.add_database('migrated', str(tmp_path / 'db.sqlite3'))
+    try:
+        benchmarks.migrate('migrated')
+        assert BannedWord.objects.using('migrated').count() == 2
+    finally:
+        benchmarks.remove_database('migrated')
+    assert BannedWord.objects.count() == words
+
+
+@pytest.mark.django_db
+def test_reads_stay_on_default_inside_transaction():
+    assert ReadReplicaRouter().db_for_read(News) == 'default'
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA synchronous')
+        assert cursor.fetchone() == (1,)
+
+
+def test_pool_reuses_checks_and_bounds_connections(tmp_path):
+    connection_pool = pool.Pool(max_size=1, timeout=0.01, check_after=0)
+    opened = []
+
+    def open_connection():
+        raw = sqlite3.connect(tmp_path / 'db.sqlite3', check_same_thread=False)
+        opened.append(raw)
+        return raw
+
+    def is_usable(raw):
+        try:
+            raw.execute('SELECT 1')
+        except sqlite3.Error:
+            return False
+        return True
+
+    raw, created = connection_pool.acquire(open_connection, is_usable)
+    with pytest.raises(OperationalError):
+        connection_pool.acquire(open_connection, is_usable)
+    connection_pool.release(raw, created)
+    assert connection_pool.acquire(open_connection, is_usable)[0] is raw
+    raw.close()
+    connection_pool.release(raw, created)
+    assert connection_pool.acquire(open_connection, is_usable)[0] is not raw
+    assert len(opened) == 2
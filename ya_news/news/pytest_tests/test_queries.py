@@ -0,0 +1,85 @@
+from datetime import date
+
+import pytest
+from django.urls import reverse
+
+from news import archive, profanity, urls
+from news.pytest_tests.constans import FORM_DATA, NEW_FORM_DATA
+
+# Число SQL-запросов на каждый маршрут news.urls. Авторизованный клиент
+# тратит два запроса на сессию и пользователя. Аргумент маршрута — имя
+# фикстуры, чей pk подставляется, или готовый кортеж.
+BUDGETS = (
+    ('client', 'get', 'news:home', None, None, 2),
+    ('client', 'get', 'news:archive', None, None, 1),
+    ('client', 'get', 'news:archive_year', (2024,), None, 2),
+    ('client', 'get', 'news:archive_month', (2024, 5), None, 2),
+    ('client', 'get', 'news:archive_day', (2024, 5, 17), None, 2),
+    ('client', 'get', 'news:search', None, {'q': 'текст'}, 4),
+    ('client', 'get', 'news:detail', 'news', None, 3),
+    ('client', 'get', 'news:comments', 'news', None, 2),
+    ('author_client', 'get', 'news:detail', 'news', None, 5),
+    ('author_client', 'post', 'news:detail', 'news', FORM_DATA, 6),
+    ('author_client', 'get', 'news:edit', 'comment', None, 3),
+    ('author_client', 'post', 'news:edit', 'comment', NEW_FORM_DATA, 6),
+    ('author_client', 'get', 'news:delete', 'comment', None, 3),
+    ('author_client', 'post', 'news:delete', 'comment', None, 5),
+    ('client', 'get', 'news:events', 'news', None, 0),
+    ('admin_client', 'get', 'news:comments_export', None, None, 3),
+    ('admin_client', 'get', 'news:metrics', None, None, 2),
+)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'client_name, method, name, arg, data, budget', BUDGETS
+)
+def test_query_budget(request, comment, django_assert_num_queries,
+                      client_name, method, name, arg, data, budget):
+    client = request.getfixturevalue(client_name)
+    if isinstance(arg, str):
+        arg = (request.getfixturevalue(arg).pk,)
+    url = reverse(name, args=arg)
+    profanity.get_engine()
+    with django_assert_num_queries(budget):
+        response = getattr(client, method)(url, data=data)
+        if response.streaming:
+            b''.join(response.streaming_content)
+    assert response.status_code < 400
+
+
+def test_every_route_has_a_budget():
+    names = {f'news:{pattern.name}' for pattern in urls.urlpatterns}
+    assert names == {name for _, _, name, *_ in BUDGETS}
+
+
+@pytest.mark.django_db
+def test_archive_queries(client, news, django_assert_num_queries):
+    url = reverse(
+        'news:archive_month', args=(news.date.year, news.date.month)
+    )
+    # Счётчики архива считаются одним запросом и затем берутся из кэша.
+    with django_assert_num_queries(2):
+        client.get(url)
+    with django_assert_num_queries(1):
+        client.get(url)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('start, end, cursor', (
+    (date(2024, 1, 1), date(2025, 1, 1), None),
+    (date(2024, 5, 1), date(2024, 6, 1), '20240517-42'),
+    (date(2024, 5, 17), date(2024, 5, 18), '20240517-42'),
+))
+def test_archive_page_is_an_index_search(start, end, cursor):
+    plan = archive.page_queryset(start, end, cursor)[:21].explain()
+    assert 'USING INDEX news_date_id_idx' in plan
+    assert 'SCAN' not in plan
+    assert 'TEMP B-TREE' not in plan
+
+
+@pytest.mark.django_db
+def test_archive_counts_are_grouped_without_sorting():
+    plan = archive.counts_queryset().explain()
+    assert 'USING COVERING INDEX news_date_id_idx' in plan
+    assert 'TEMP B-TREE' not in plan
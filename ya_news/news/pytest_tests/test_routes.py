@@ -1,9 +1,12 @@
 import pytest
 from http import HTTPStatus
 
+from asgiref.sync import async_to_sync
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
+from news import events
+
 User = get_user_model()
 
 
@@ -11,7 +14,14 @@ User = get_user_model()
 def test_pages_availability(client, news):
     urls = [
         ('news:home', None),
+        ('news:search', None),
         ('news:detail', (news.id,)),
+        ('news:comments', (news.id,)),
+        ('news:archive', None),
+        ('news:archive_year', (news.date.year,)),
+        ('news:archive_month', (news.date.year, news.date.month)),
+        ('news:archive_day', (news.date.year, news.date.month,
+                              news.date.day)),
         ('users:login', None),
         ('users:logout', None),
         ('users:signup', None),
@@ -46,3 +56,38 @@ def test_redirect_for_anonymous_client(client, comment):
         response = client.get(url)
         assert response.status_code == HTTPStatus.FOUND
         assert response.url == redirect_url
+
+
+@pytest.mark.django_db
+def test_event_stream_routes(client, news):
+    url = reverse('news:events', args=(news.id,))
+    assert client.get(url).status_code == HTTPStatus.NO_CONTENT
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        'type': 'http',
+        'method': 'GET',
+        'path': reverse('news:events', args=(news.id + 1,)),
+    }
+    async_to_sync(events.EventsApplication(None))(scope, None, send)
+    assert sent[0]['status'] == HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_archive_rejects_bad_dates_and_cursors(client):
+    assert client.get(
+        reverse('news:archive_month', args=(2024, 13))
+    ).status_code == HTTPStatus.NOT_FOUND
+    assert client.get(
+        reverse('news:archive_day', args=(2023, 2, 29))
+    ).status_code == HTTPStatus.NOT_FOUND
+    assert client.get(
+        reverse('news:archive_year', args=(10 ** 30,))
+    ).status_code == HTTPStatus.NOT_FOUND
+    url = reverse('news:archive_year', args=(2024,))
+    for cursor in ('bad', f'20240101-{10 ** 30}'):
+        response = client.get(url, {'after': cursor})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
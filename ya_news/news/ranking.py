@@ -0,0 +1,274 @@
+"""
+Рейтинг новостей для главной: свежесть плюс скорость комментариев.
+
+Вклад события с весом ``w`` в момент ``t`` затухает экспоненциально с
+периодом полураспада ``HALF_LIFE_HOURS`` из ``NEWS_RANKING``. Рейтинг
+новости — сумма вкладов публикации (вес ``NEWS_WEIGHT``) и каждого
+комментария (вес ``COMMENT_WEIGHT``), и хранится он в логарифмической
+шкале: ``log Σ w · exp(λ·t)``, где ``λ = ln 2 / период``. Такое число
+не зависит от текущего времени — в любой момент все рейтинги делятся
+на один и тот же ``exp(λ·now)`` и порядок новостей не меняется, —
+поэтому старые строки не пересчитываются, а новый комментарий просто
+добавляется к рейтингу своей новости через ``logaddexp``.
+
+Рейтинги лежат в таблице ``NewsRanking`` с индексом по ``-score``, и
+главная при ``NEWS_HOME_ORDERING = 'ranking'`` читает их одним запросом
+по индексу. ``refresh`` добавляет новые новости и учитывает новые
+комментарии. Транзакции комментариев могут закоммититься не в порядке
+id, поэтому последние ``LOOKBACK_COMMENTS`` id считаются незакрытыми:
+их вклад хранится отдельно от окончательной части рейтинга
+(``base_score``) и пересчитывается при каждом обновлении, так что
+опоздавший комментарий из окна будет учтён, а повторная обработка не
+посчитает комментарий дважды. Вышедшие из окна комментарии один раз
+добавляются к окончательной части. Удалённые комментарии, опоздавшие
+больше чем на окно и смена настроек учитываются только полным
+пересчётом ``refresh(full=True)``. Обновляет рейтинг команда
+``refresh_news_ranking`` или фоновый поток процесса, если задан
+``NEWS_RANKING_REFRESH_INTERVAL``.
+"""
+import logging
+import math
+import threading
+from collections import Counter
+from datetime import datetime, time
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Comment, News, NewsRanking
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 5000
+
+stats = Counter()
+scheduler = None
+
+
+def decay_rate():
+    return math.log(2) / (settings.NEWS_RANKING['HALF_LIFE_HOURS'] * 3600)
+
+
+def event_score(moment, weight):
+    """Вклад события в логарифмической шкале."""
+    return decay_rate() * moment.timestamp() + math.log(weight)
+
+
+def news_score(date):
+    return event_score(
+        timezone.make_aware(datetime.combine(date, time.min)),
+        settings.NEWS_RANKING['NEWS_WEIGHT'],
+    )
+
+
+def logaddexp(first, second):
+    """``log(exp(first) + exp(second))`` без переполнения."""
+    high, low = max(first, second), min(first, second)
+    return high + math.log1p(math.exp(low - high))
+
+
+def ranked_news():
+    """
+    Новости по убыванию рейтинга.
+
+    Число и время последнего комментария считаются подзапросами только
+    для выбранных строк, а не группировкой по всем комментариям.
+    """
+    comments = Comment.objects.filter(news=OuterRef('pk')).order_by()
+    return News.objects.filter(ranking__isnull=False).annotate(
+        comment_count=Coalesce(Subquery(
+            comments.values('news').annotate(count=Count('pk'))
+            .values('count')
+        ), 0),
+        last_comment=Subquery(
+            comments.order_by('-created').values('created')[:1]
+        ),
+    ).order_by('-ranking__score', '-ranking__news_id')
+
+
+def home_news():
+    """Новости главной в порядке из настройки ``NEWS_HOME_ORDERING``."""
+    if settings.NEWS_HOME_ORDERING == 'ranking':
+        return ranked_news()
+    # Meta.ordering в запросах с группировкой не применяется.
+    return News.objects.annotate(
+        last_comment=Max('comment__created'),
+        comment_count=Count('comment'),
+    ).order_by('-date', '-id')
+
+
+def add_missing_news(batch_size):
+    """Строки рейтинга для новостей без них; возвращает их число."""
+    missing = News.objects.filter(ranking__isnull=True).order_by('pk')
+    added = last = 0
+    while True:
+        batch = list(
+            missing.filter(pk__gt=last).values_list('pk', 'date')[:batch_size]
+        )
+        if not batch:
+            return added
+        NewsRanking.objects.bulk_create(
+            new_row(pk, date) for pk, date in batch
+        )
+        added += len(batch)
+        last = batch[-1][0]
+
+
+def new_row(news_id, date):
+    score = news_score(date)
+    return NewsRanking(news_id=news_id, score=score, base_score=score)
+
+
+def add_score(total, score):
+    return score if total is None else logaddexp(total, score)
+
+
+def scan_comments(after, sealed, batch_size):
+    """
+    Вклады комментариев с id больше ``after`` по новостям.
+
+    Возвращает для каждой новости вклад и число комментариев до
+    ``sealed`` включительно (окончательная часть) и после него (окно).
+    """
+    comments = Comment.objects.order_by('pk').values_list(
+        'pk', 'news_id', 'created'
+    )
+    rate = decay_rate()
+    weight = math.log(settings.NEWS_RANKING['COMMENT_WEIGHT'])
+    sums = {}
+    while True:
+        batch = list(comments.filter(pk__gt=after)[:batch_size])
+        if not batch:
+            return sums
+        for pk, news_id, moment in batch:
+            # [окончательный вклад, их число, вклад окна, его размер]
+            parts = sums.setdefault(news_id, [None, 0, None, 0])
+            offset = 0 if pk <= sealed else 2
+            parts[offset] = add_score(
+                parts[offset], rate * moment.timestamp() + weight
+            )
+            parts[offset + 1] += 1
+        after = batch[-1][0]
+
+
+def apply_new_comments(batch_size):
+    """Учитывает новые комментарии; возвращает, на сколько выросло их число."""
+    sealed = NewsRanking.objects.aggregate(
+        last=Max('last_comment_id')
+    )['last'] or 0
+    head = Comment.objects.aggregate(last=Max('pk'))['last'] or 0
+    new_sealed = max(
+        sealed, head - settings.NEWS_RANKING['LOOKBACK_COMMENTS']
+    )
+    sums = scan_comments(sealed, new_sealed, batch_size)
+    news_ids = sorted(sums)
+    rows = []
+    created = []
+    processed = 0
+    for start in range(0, len(news_ids), batch_size):
+        needed = news_ids[start:start + batch_size]
+        found = {
+            row.news_id: row for row in
+            NewsRanking.objects.select_for_update().filter(news_id__in=needed)
+        }
+        # Новости, появившиеся после add_missing_news.
+        for pk, date in News.objects.filter(
+            pk__in=set(needed) - found.keys()
+        ).values_list('pk', 'date'):
+            found[pk] = new_row(pk, date)
+            created.append(found[pk])
+        for row in found.values():
+            if row.last_comment_id > sealed:
+                # Уже обработана параллельным обновлением.
+                continue
+            base, base_count, window, window_count = sums[row.news_id]
+            if base is not None:
+                row.base_score = logaddexp(row.base_score, base)
+                row.base_count += base_count
+            row.score = add_score(window, row.base_score)
+            count = row.base_count + window_count
+            processed += count - row.comment_count
+            row.comment_count = count
+            row.last_comment_id = new_sealed
+            rows.append(row)
+    NewsRanking.objects.bulk_create(created, batch_size=batch_size)
+    created_ids = {row.news_id for row in created}
+    save_scores(row for row in rows if row.news_id not in created_ids)
+    return processed
+
+
+def save_scores(rows):
+    """
+    Записывает рейтинги одним ``executemany``.
+
+    ``bulk_update`` собирает ``CASE`` по всем строкам пачки, и SQLite
+    проверяет его для каждой обновляемой строки — квадратично по пачке.
+    """
+    quote = connection.ops.quote_name
+    meta = NewsRanking._meta
+    fields = (
+        'score', 'base_score', 'base_count', 'comment_count',
+        'last_comment_id',
+    )
+    assignments = ', '.join(f'{quote(name)} = %s' for name in fields)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'UPDATE {quote(meta.db_table)} SET {assignments} '
+            f'WHERE {quote(meta.pk.column)} = %s',
+            [
+                [getattr(row, name) for name in fields] + [row.news_id]
+                for row in rows
+            ],
+        )
+
+
+def refresh(full=False, batch_size=BATCH_SIZE):
+    """Обновляет рейтинги; возвращает число новых новостей и комментариев."""
+    started = perf_counter()
+    with transaction.atomic():
+        if full:
+            NewsRanking.objects.all().delete()
+        added = add_missing_news(batch_size)
+        processed = apply_new_comments(batch_size)
+    stats['refreshes'] += 1
+    stats['news'] += added
+    stats['comments'] += processed
+    stats['last_ms'] = round((perf_counter() - started) * 1000)
+    return added, processed
+
+
+class Scheduler(threading.Thread):
+    """Фоновый поток, который обновляет рейтинг раз в ``interval`` секунд."""
+
+    def __init__(self, interval):
+        super().__init__(name='news-ranking', daemon=True)
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                refresh()
+            except Exception:
+                stats['errors'] += 1
+                logger.exception('Не удалось обновить рейтинг новостей.')
+            finally:
+                # Соединения потока возвращаются в пул до следующего раза.
+                connections.close_all()
+
+    def stop(self):
+        self.stopped.set()
+
+
+def start_scheduler():
+    """Запускает фоновое обновление, если задан интервал."""
+    global scheduler
+    interval = settings.NEWS_RANKING_REFRESH_INTERVAL
+    if interval and scheduler is None:
+        scheduler = Scheduler(interval)
+        scheduler.start()
+    return scheduler
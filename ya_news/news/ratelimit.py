@@ -0,0 +1,126 @@
+"""
+Ограничение частоты записей: token bucket по пользователю и IP.
+
+Настройка ``RATE_LIMITS`` задаёт для каждой области ёмкость корзины и
+период, за который она наполняется целиком. Состояние корзины —
+неизменяемый кортеж ``(tokens, updated)``, который целиком заменяется
+в словаре, поэтому чтение обходится без блокировок; гонка двух
+запросов одного клиента в худшем случае пропустит лишний токен.
+
+Первый уровень хранения — LRU в памяти процесса размером
+``RATE_LIMIT_LRU_SIZE``. Второй, необязательный, — кэш Django с
+псевдонимом из ``RATE_LIMIT_CACHE``, общий для всех процессов. Пока
+корзина в памяти пуста, в общий кэш не ходим вовсе.
+"""
+import math
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+KEY_PREFIX = 'news:ratelimit:'
+
+stats = Counter()
+limiters = {}
+
+
+class LocalStore:
+    """LRU-словарь корзин: блокировка нужна только для записи."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        return self.buckets.get(key)
+
+    def set(self, key, state):
+        with self.lock:
+            self.buckets[key] = state
+            self.buckets.move_to_end(key)
+            while len(self.buckets) > self.maxsize:
+                self.buckets.popitem(last=False)
+
+
+class RateLimiter:
+
+    def __init__(self, capacity, period, local, shared=None):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.timeout = math.ceil(period)
+        self.local = local
+        self.shared = shared
+
+    def refill(self, state, now):
+        tokens, updated = state
+        return min(self.capacity, tokens + (now - updated) * self.rate)
+
+    def hit(self, key, now=None):
+        """Забирает токен; возвращает 0 или сколько секунд ждать."""
+        if now is None:
+            now = time.time()
+        state = self.local.get(key)
+        if self.shared is not None and (
+            state is None or self.refill(state, now) >= 1
+        ):
+            state = self.shared.get(KEY_PREFIX + key, state)
+        tokens = self.capacity if state is None else self.refill(state, now)
+        if tokens < 1:
+            stats['limited'] += 1
+            return (1 - tokens) / self.rate
+        state = (tokens - 1, now)
+        self.local.set(key, state)
+        if self.shared is not None:
+            self.shared.set(KEY_PREFIX + key, state, self.timeout)
+        stats['allowed'] += 1
+        return 0
+
+
+def get_limiter(scope):
+    limiter = limiters.get(scope)
+    if limiter is None:
+        capacity, period = settings.RATE_LIMITS[scope]
+        alias = settings.RATE_LIMIT_CACHE
+        limiter = limiters.setdefault(scope, RateLimiter(
+            capacity,
+            period,
+            LocalStore(settings.RATE_LIMIT_LRU_SIZE),
+            caches[alias] if alias else None,
+        ))
+    return limiter
+
+
+def reset():
+    """Забывает все корзины процесса, например между тестами."""
+    limiters.clear()
+    stats.clear()
+
+
+def client_key(request):
+    """Пользователь — по id: смена адреса не даёт ему новую корзину."""
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    # REMOTE_ADDR, а не X-Forwarded-For: заголовок подделывается.
+    return f'ip:{request.META.get("REMOTE_ADDR")}'
+
+
+class RateLimitMixin:
+    """Ограничивает частоту POST-запросов к представлению."""
+    rate_limit_scope = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method == 'POST':
+            retry_after = get_limiter(self.rate_limit_scope).hit(
+                f'{self.rate_limit_scope}:{client_key(request)}'
+            )
+            if retry_after:
+                response = HttpResponse(
+                    'Слишком много запросов, попробуйте позже.', status=429
+                )
+                response['Retry-After'] = math.ceil(retry_after)
+                return response
+        return super().dispatch(request, *args, **kwargs)
@@ -0,0 +1,168 @@
+"""
+Полнотекстовый поиск по новостям и комментариям.
+
+В SQLite индекс — виртуальные таблицы FTS5, в которые пишутся основы
+слов (стеммер Snowball для русского языка); в PostgreSQL — таблицы
+со столбцом tsvector в конфигурации ``russian`` и GIN-индексом.
+Оба бэкенда реализуют один интерфейс, индекс обновляется сигналами
+моделей ``News`` и ``Comment``.
+"""
+import re
+from functools import lru_cache
+
+import snowballstemmer
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+
+from .models import Comment, News
+
+WORD = re.compile(r'\w+')
+stemmer = snowballstemmer.stemmer('russian')
+
+
+@lru_cache(maxsize=100000)
+def stem_word(word):
+    """Основа слова; словарь текстов невелик, поэтому основы кэшируются."""
+    return stemmer.stemWord(word)
+
+
+def stem_text(text):
+    """Заменяет слова текста их основами."""
+    words = WORD.findall(text.lower().replace('ё', 'е'))
+    return ' '.join(map(stem_word, words))
+
+
+def news_fields(news):
+    return (news.title, news.text)
+
+
+def comment_fields(comment):
+    return (comment.text,)
+
+
+class SQLiteBackend:
+    tables = {
+        News: ('news_news_fts', ('title', 'text'), (10.0, 1.0)),
+        Comment: ('news_comment_fts', ('text',), (1.0,)),
+    }
+    fields = {News: news_fields, Comment: comment_fields}
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def index_many(self, model, objects):
+        table, columns, _ = self.tables[model]
+        rows = [
+            (obj.pk, *map(stem_text, self.fields[model](obj)))
+            for obj in objects
+        ]
+        placeholders = ', '.join(['%s'] * (len(columns) + 1))
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {table} WHERE rowid = %s',
+                [(row[0],) for row in rows],
+            )
+            cursor.executemany(
+                f'INSERT INTO {table} (rowid, {", ".join(columns)}) '
+                f'VALUES ({placeholders})',
+                rows,
+            )
+
+    def remove(self, model, pk):
+        table = self.tables[model][0]
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {table} WHERE rowid = %s', [pk])
+
+    def clear(self, model):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.tables[model][0]}')
+
+    def search(self, model, query, limit):
+        table, _, weights = self.tables[model]
+        terms = stem_text(query).split()
+        if not terms:
+            return []
+        # Каждая основа в кавычках, чтобы не разбирать синтаксис FTS5.
+        match = ' '.join(f'"{term}"' for term in terms)
+        weights = ', '.join(map(str, weights))
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {table} WHERE {table} MATCH %s '
+                f'ORDER BY bm25({table}, {weights}) LIMIT %s',
+                [match, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresBackend:
+    tables = {
+        News: (
+            'news_news_search',
+            "setweight(to_tsvector('russian', %s), 'A')"
+            " || to_tsvector('russian', %s)",
+        ),
+        Comment: ('news_comment_search', "to_tsvector('russian', %s)"),
+    }
+    fields = {News: news_fields, Comment: comment_fields}
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def index_many(self, model, objects):
+        table, document = self.tables[model]
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {table} (object_id, document) '
+                f'VALUES (%s, {document}) '
+                'ON CONFLICT (object_id) DO UPDATE '
+                'SET document = EXCLUDED.document',
+                [(obj.pk, *self.fields[model](obj)) for obj in objects],
+            )
+
+    def remove(self, model, pk):
+        table = self.tables[model][0]
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {table} WHERE object_id = %s', [pk]
+            )
+
+    def clear(self, model):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.tables[model][0]}')
+
+    def search(self, model, query, limit):
+        table = self.tables[model][0]
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT object_id FROM {table}, '
+                "plainto_tsquery('russian', %s) query "
+                'WHERE document @@ query '
+                'ORDER BY ts_rank(document, query) DESC LIMIT %s',
+                [query, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+BACKENDS = {
+    'sqlite': SQLiteBackend,
+    'postgresql': PostgresBackend,
+}
+
+
+def get_backend(using='default'):
+    connection = connections[using]
+    try:
+        return BACKENDS[connection.vendor](connection)
+    except KeyError:
+        raise ImproperlyConfigured(
+            f'Полнотекстовый поиск не поддерживает {connection.vendor}.'
+        )
+
+
+def search(model, query, limit, queryset=None):
+    """Объекты модели, подходящие под запрос, от самых релевантных."""
+    ids = get_backend().search(model, query, limit)
+    if queryset is None:
+        queryset = model.objects.all()
+    objects = queryset.in_bulk(ids)
+    return [objects[pk] for pk in ids if pk in objects]
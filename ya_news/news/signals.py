@@ -0,0 +1,56 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import archive, cache, events, profanity, search
+from .models import BannedWord, Comment, News
+
+
+@receiver((post_save, post_delete), sender=News)
+def invalidate_news(sender, instance, using, **kwargs):
+    # Только после коммита: иначе параллельный запрос успеет положить
+    # в кэш карточку со старыми данными уже под новой версией.
+    news_id = instance.pk
+    transaction.on_commit(lambda: cache.invalidate(news_id), using=using)
+
+
+@receiver((post_save, post_delete), sender=News)
+def invalidate_archive(sender, using, **kwargs):
+    transaction.on_commit(archive.invalidate, using=using)
+
+
+@receiver(post_delete, sender=News)
+def forget_news_events(sender, instance, **kwargs):
+    events.known_news.discard(instance.pk)
+
+
+@receiver((post_save, post_delete), sender=Comment)
+def invalidate_comment_news(sender, instance, using, **kwargs):
+    news_id = instance.news_id
+    transaction.on_commit(lambda: cache.invalidate(news_id), using=using)
+
+
+@receiver(post_save, sender=Comment)
+def publish_new_comment(sender, instance, created, using, **kwargs):
+    if created:
+        transaction.on_commit(
+            lambda: events.publish_comment(instance), using=using
+        )
+
+
+@receiver((post_save, post_delete), sender=BannedWord)
+def bump_banned_words_version(sender, using, **kwargs):
+    # После коммита, чтобы под новой версией не собрали старый список.
+    transaction.on_commit(profanity.bump_version, using=using)
+
+
+@receiver(post_save, sender=News)
+@receiver(post_save, sender=Comment)
+def index_for_search(sender, instance, using, **kwargs):
+    search.get_backend(using).index_many(sender, [instance])
+
+
+@receiver(post_delete, sender=News)
+@receiver(post_delete, sender=Comment)
+def remove_from_search(sender, instance, using, **kwargs):
+    search.get_backend(using).remove(sender, instance.pk)
@@ -0,0 +1,28 @@
+"""
+Настройка соединений SQLite для конкурентной нагрузки.
+
+При открытии каждого соединения выполняются PRAGMA из настройки
+``SQLITE_PRAGMAS``: журнал WAL, чтобы читатели не ждали писателя,
+``synchronous=NORMAL`` (в режиме WAL это безопасно при падении
+процесса), ожидание снятия блокировки вместо мгновенной ошибки
+``database is locked`` и mmap для чтения.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# Режим журнала хранится в файле базы, и соединение только для чтения
+# не может его менять.
+WRITE_ONLY_PRAGMAS = {'journal_mode'}
+
+
+@receiver(connection_created)
+def apply_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    read_only = 'mode=ro' in str(connection.settings_dict['NAME'])
+    for name, value in settings.SQLITE_PRAGMAS.items():
+        if read_only and name in WRITE_ONLY_PRAGMAS:
+            continue
+        # Мимо курсора Django, чтобы PRAGMA не считались запросами.
+        connection.connection.execute(f'PRAGMA {name} = {value}')
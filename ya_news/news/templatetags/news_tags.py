@@ -0,0 +1,18 @@
+from django import template
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from news.cache import get_fragment
+
+register = template.Library()
+
+
+@register.simple_tag
+def news_item(news):
+    """Карточка новости для главной, закэшированная целиком."""
+    return mark_safe(get_fragment(
+        news,
+        lambda: render_to_string('news/includes/news_item.html', {
+            'news': news
+        }),
+    ))
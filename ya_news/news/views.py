@@ -1,13 +1,38 @@
+from datetime import date
+
 from django.conf import settings
-from django.contrib.auth.mixins import LoginRequiredMixin
-from django.shortcuts import get_object_or_404
+from django.contrib.auth.mixins import (
+    LoginRequiredMixin, UserPassesTestMixin
+)
+from django.http import (
+    Http404, HttpResponse, HttpResponseBadRequest, JsonResponse
+)
+from django.template.loader import render_to_string
 from django.urls import reverse
+from django.utils.decorators import method_decorator
 from django.views import generic
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import condition
 
+from . import (
+    archive, cache, conditional, events, profanity, ranking, ratelimit
+)
+from .db import pool
+from .export import ENCODERS, stream_export
 from .forms import CommentForm
+from .instrumentation import collector, template_collector
 from .models import Comment, News
+from .pagination import get_comments_page, parse_id
+from .search import search
+
 
+news_condition = method_decorator(
+    condition(etag_func=conditional.etag),
+    name='dispatch',
+)
 
+
+@news_condition
 class NewsList(generic.ListView):
     """Список новостей."""
     model = News
@@ -17,23 +42,29 @@ class NewsList(generic.ListView):
         """
         Выводим только несколько последних новостей.
 
-        Их количество определяется в настройках проекта.
+        Их количество определяется в настройках проекта, порядок — по
+        дате или по рейтингу, см. ``NEWS_HOME_ORDERING``. Для главной
+        нужно только число комментариев, поэтому считаем его в базе,
+        а не загружаем все комментарии каждой новости.
         """
-        return self.model.objects.prefetch_related(
-            'comment_set'
-        )[:settings.NEWS_COUNT_ON_HOME_PAGE]
+        return ranking.home_news()[:settings.NEWS_COUNT_ON_HOME_PAGE]
 
 
-class NewsDetail(generic.DetailView):
-    model = News
-    template_name = 'news/detail.html'
+class CommentsPageMixin:
+    """Добавляет в контекст первую страницу комментариев новости."""
 
-    def get_object(self, queryset=None):
-        obj = get_object_or_404(
-            self.model.objects.prefetch_related('comment_set__author'),
-            pk=self.kwargs['pk']
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['comments'], context['next_cursor'] = get_comments_page(
+            self.object.pk, settings.COMMENTS_COUNT_ON_DETAIL_PAGE
         )
-        return obj
+        return context
+
+
+@news_condition
+class NewsDetail(CommentsPageMixin, generic.DetailView):
+    model = News
+    template_name = 'news/detail.html'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -44,12 +75,15 @@ class NewsDetail(generic.DetailView):
 
 class NewsComment(
         LoginRequiredMixin,
+        ratelimit.RateLimitMixin,
+        CommentsPageMixin,
         generic.detail.SingleObjectMixin,
         generic.FormView
 ):
     model = News
     form_class = CommentForm
     template_name = 'news/detail.html'
+    rate_limit_scope = 'comment'
 
     def post(self, request, *args, **kwargs):
         self.object = self.get_object()
@@ -63,8 +97,9 @@ class NewsComment(
         return super().form_valid(form)
 
     def get_success_url(self):
-        post = self.get_object()
-        return reverse('news:detail', kwargs={'pk': post.pk}) + '#comments'
+        return reverse(
+            'news:detail', kwargs={'pk': self.object.pk}
+        ) + '#comments'
 
 
 class NewsDetailView(generic.View):
@@ -78,19 +113,117 @@ class NewsDetailView(generic.View):
         return view(request, *args, **kwargs)
 
 
+class NewsCommentsPage(generic.detail.SingleObjectMixin, generic.View):
+    """
+    Следующая страница комментариев для ссылки «Показать ещё».
+
+    Отдаёт HTML-фрагмент, а с параметром ``format=json`` — JSON
+    с фрагментом и курсором следующей страницы.
+    """
+    model = News
+
+    def get(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        try:
+            comments, next_cursor = get_comments_page(
+                self.object.pk,
+                settings.COMMENTS_COUNT_ON_DETAIL_PAGE,
+                request.GET.get('after'),
+            )
+        except ValueError:
+            return HttpResponseBadRequest()
+        html = render_to_string(
+            'news/includes/comments.html',
+            {
+                'news': self.object,
+                'comments': comments,
+                'next_cursor': next_cursor,
+            },
+            request,
+        )
+        if request.GET.get('format') == 'json':
+            return JsonResponse({'html': html, 'next': next_cursor})
+        return HttpResponse(html)
+
+
+class NewsArchive(generic.TemplateView):
+    """
+    Архив: годы, месяцы года или дни месяца с числом новостей.
+
+    Для года, месяца и дня ниже идут новости периода от новых к старым,
+    следующая страница — по курсору ``after``.
+    """
+    template_name = 'news/archive.html'
+
+    def get(self, request, *args, **kwargs):
+        try:
+            return super().get(request, *args, **kwargs)
+        except ValueError:
+            return HttpResponseBadRequest()
+
+    def get_context_data(self, year=None, month=None, day=None, **kwargs):
+        context = super().get_context_data(**kwargs)
+        counts = archive.get_counts()
+        if year is None:
+            context['periods'] = [
+                (date(year, 1, 1), count)
+                for year, count in sorted(counts['years'].items())
+            ]
+            return context
+        try:
+            start, end = archive.period_bounds(year, month, day)
+        except ValueError:
+            raise Http404('Такой даты нет.')
+        if month is None:
+            context['periods'] = [
+                (date(year, month, 1), count)
+                for (year, month), count in sorted(counts['months'].items())
+                if year == start.year
+            ]
+        elif day is None:
+            context['periods'] = [
+                (day, count) for day, count in counts['days'].items()
+                if start <= day < end
+            ]
+        context['news_list'], context['next_cursor'] = archive.get_page(
+            start, end, settings.NEWS_ARCHIVE_PAGE_SIZE,
+            self.request.GET.get('after'),
+        )
+        context.update(year=year, month=month, day=day, start=start)
+        return context
+
+
+class NewsSearch(generic.TemplateView):
+    """Полнотекстовый поиск по новостям и комментариям."""
+    template_name = 'news/search.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get('q', '')
+        limit = settings.SEARCH_RESULTS_COUNT
+        context['query'] = query
+        context['news_list'] = search(News, query, limit)
+        context['comments'] = search(
+            Comment, query, limit,
+            Comment.objects.select_related('news', 'author'),
+        )
+        return context
+
+
 class CommentBase(LoginRequiredMixin):
     """Базовый класс для работы с комментариями."""
     model = Comment
 
     def get_success_url(self):
-        comment = self.get_object()
         return reverse(
-            'news:detail', kwargs={'pk': comment.news.pk}
+            'news:detail', kwargs={'pk': self.object.news_id}
         ) + '#comments'
 
     def get_queryset(self):
         """Пользователь может работать только со своими комментариями."""
-        return self.model.objects.filter(author=self.request.user)
+        return self.model.objects.filter(
+            author=self.request.user
+        ).select_related('news')
 
 
 class CommentUpdate(CommentBase, generic.UpdateView):
@@ -102,3 +235,57 @@ class CommentUpdate(CommentBase, generic.UpdateView):
 class CommentDelete(CommentBase, generic.DeleteView):
     """Удаление комментария."""
     template_name = 'news/delete.html'
+
+
+class CommentEvents(generic.View):
+    """
+    Лента новых комментариев под WSGI недоступна.
+
+    Под ASGI маршрут перехватывает ``events.EventsApplication``; ответ 204
+    говорит браузеру не переподключаться к ленте.
+    """
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(status=204)
+
+
+class Metrics(LoginRequiredMixin, UserPassesTestMixin, generic.View):
+    """Метрики маршрутов и кэшей этого процесса, только для персонала."""
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse({
+            'views': collector.snapshot(),
+            'templates': template_collector.snapshot(),
+            'fragment_cache': dict(cache.stats),
+            'banned_words': dict(profanity.stats),
+            'rate_limit': dict(ratelimit.stats),
+            'db_pool': dict(pool.stats),
+            'events': dict(events.stats),
+            'ranking': dict(ranking.stats),
+            'archive': dict(archive.stats),
+        })
+
+
+@method_decorator(gzip_page, name='dispatch')
+class CommentExport(LoginRequiredMixin, UserPassesTestMixin, generic.View):
+    """Выгрузка комментариев в NDJSON или CSV для модераторов."""
+    fields = ('id', 'news_id', 'author__username', 'created', 'text')
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, *args, **kwargs):
+        fmt = request.GET.get('format', 'ndjson')
+        if fmt not in ENCODERS:
+            return HttpResponseBadRequest()
+        comments = Comment.objects.order_by('id')
+        news = request.GET.get('news')
+        if news is not None:
+            try:
+                comments = comments.filter(news_id=parse_id(news))
+            except ValueError:
+                return HttpResponseBadRequest()
+        return stream_export(comments, self.fields, fmt, 'comments')
@@ -13,4 +13,16 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yanews.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from news.events import EventsApplication  # noqa: E402
+
+application = EventsApplication(django_application)
+
+from news import profanity  # noqa: E402
+from news.ranking import start_scheduler  # noqa: E402
+from news.rendering import warm_up  # noqa: E402
+
+warm_up()
+profanity.warm_up()
+start_scheduler()
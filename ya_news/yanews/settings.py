@@ -21,6 +21,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'news.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -36,7 +37,6 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -44,6 +44,14 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Шаблоны разбираются один раз на процесс и при DEBUG,
+            # см. news/rendering.py.
+            'loaders': [
+                ('news.rendering.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
@@ -51,10 +59,45 @@ TEMPLATES = [
 WSGI_APPLICATION = 'yanews.wsgi.application'
 
 
+# Пул соединений на процесс, см. news/db/pool.py. Для PostgreSQL
+# укажите ENGINE 'news.db.postgresql' с тем же ключом POOL.
+DATABASE_POOL = {
+    'MAX_SIZE': 8,
+    'TIMEOUT': 10,
+    'MAX_AGE': 600,
+    'CHECK_AFTER': 30,
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'news.db.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'POOL': DATABASE_POOL,
+    },
+    # Тот же файл только для чтения: в режиме WAL читатели не ждут
+    # писателя. В тестах псевдоним смотрит в тестовую базу default.
+    'replica': {
+        'ENGINE': 'news.db.sqlite3',
+        'NAME': f'file:{BASE_DIR / "db.sqlite3"}?mode=ro',
+        'POOL': DATABASE_POOL,
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+DATABASE_ROUTERS = ['news.routers.ReadReplicaRouter']
+
+# PRAGMA для каждого нового соединения SQLite, см. news/sqlite.py.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 20000,
+    'mmap_size': 256 * 1024 * 1024,
+}
+
+# Для нескольких воркеров укажите общий бэкенд, например
+# 'django_redis.cache.RedisCache' с LOCATION='redis://127.0.0.1:6379/1'.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
@@ -80,3 +123,65 @@ LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('news:home')
 
 NEWS_COUNT_ON_HOME_PAGE = 10
+
+# Порядок новостей на главной: 'date' — по дате, 'ranking' — по
+# рейтингу из таблицы NewsRanking, см. news/ranking.py.
+NEWS_HOME_ORDERING = 'date'
+# Экспоненциальное затухание вклада публикации и комментариев. После
+# изменения нужен полный пересчёт: refresh_news_ranking --full.
+NEWS_RANKING = {
+    'HALF_LIFE_HOURS': 24,
+    'NEWS_WEIGHT': 10,
+    'COMMENT_WEIGHT': 1,
+    # Сколько последних id комментариев пересчитывается при каждом
+    # обновлении: столько комментариев транзакция может опоздать.
+    'LOOKBACK_COMMENTS': 1000,
+}
+# Период фонового обновления рейтинга в секундах; None — только
+# командой refresh_news_ranking.
+NEWS_RANKING_REFRESH_INTERVAL = None
+
+COMMENTS_COUNT_ON_DETAIL_PAGE = 50
+
+SEARCH_RESULTS_COUNT = 20
+
+NEWS_ARCHIVE_PAGE_SIZE = 20
+
+NEWS_FRAGMENT_CACHE = 'default'
+NEWS_FRAGMENT_CACHE_TIMEOUT = 60 * 60
+
+# Асинхронные главная и страница новости для запуска под ASGI,
+# см. news/async_views.py.
+NEWS_ASYNC_VIEWS = False
+
+# Лента новых комментариев, см. news/events.py. Брокер для нескольких
+# воркеров должен рассылать сообщения всем процессам.
+NEWS_EVENTS_BROKER = 'news.events.InMemoryBroker'
+NEWS_EVENTS_QUEUE_SIZE = 100
+NEWS_EVENTS_KEEPALIVE = 15
+
+NEWS_PROFANITY_ENGINE = 'news.profanity.RegexEngine'
+NEWS_BANNED_WORDS_CACHE = 'default'
+
+# Ёмкость корзины и период её полного наполнения в секундах.
+RATE_LIMITS = {
+    'comment': (5, 60),
+}
+RATE_LIMIT_LRU_SIZE = 10000
+# Псевдоним общего для процессов кэша; None — только память процесса.
+RATE_LIMIT_CACHE = None
+
+# Сколько SQL-запросов допустимо для маршрута, прежде чем писать
+# предупреждение в лог.
+QUERY_BUDGETS = {
+    'news:home': 4,
+    'news:search': 6,
+    'news:detail': 6,
+    'news:comments': 4,
+    'news:archive': 3,
+    'news:archive_year': 4,
+    'news:archive_month': 4,
+    'news:archive_day': 4,
+    'news:edit': 6,
+    'news:delete': 5,
+}
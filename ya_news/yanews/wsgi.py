@@ -14,3 +14,11 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yanews.settings')
 
 application = get_wsgi_application()
+
+from news import profanity  # noqa: E402
+from news.ranking import start_scheduler  # noqa: E402
+from news.rendering import warm_up  # noqa: E402
+
+warm_up()
+profanity.warm_up()
+start_scheduler()
@@ -0,0 +1,64 @@
+"""
+Асинхронные варианты списка заметок и заметки для запуска под ASGI.
+
+В Django 3.2 нет асинхронного ORM и асинхронной отрисовки шаблонов.
+Поэтому вся работа с базой — пользователь из сессии и заметки — делается
+за один переход в поток через ``sync_to_async``, а шаблон рисуется уже
+в цикле событий: к этому моменту все ленивые объекты запроса вычислены.
+Контекст собирают те же классы, что и в синхронных представлениях.
+Включаются настройкой ``NOTES_ASYNC_VIEWS``.
+"""
+import time
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, HttpResponseNotAllowed
+from django.template.loader import render_to_string
+
+from .views import NoteDetail, NotesList
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def load_list(view):
+    view.object_list = view.get_queryset()
+    return view.get_context_data()
+
+
+def load_detail(view):
+    view.object = view.get_object()
+    return view.get_context_data(object=view.object)
+
+
+def fetch(view, load):
+    """Работа представления с базой: редирект на вход или контекст."""
+    if not view.request.user.is_authenticated:
+        return view.handle_no_permission(), None
+    return None, load(view)
+
+
+async def respond(request, view_class, load, **kwargs):
+    if request.method not in SAFE_METHODS:
+        return HttpResponseNotAllowed(SAFE_METHODS)
+    view = view_class()
+    view.setup(request, **kwargs)
+    response, context = await sync_to_async(fetch)(view, load)
+    if response is not None:
+        return response
+    started = time.perf_counter()
+    response = HttpResponse(render_to_string(
+        view.get_template_names(), context, request
+    ))
+    timer = getattr(request, 'query_timer', None)
+    if timer is not None:
+        timer.render_duration = time.perf_counter() - started
+    return response
+
+
+async def notes_list(request):
+    """Список заметок: как ``NotesList``."""
+    return await respond(request, NotesList, load_list)
+
+
+async def note_detail(request, slug):
+    """Заметка: как ``NoteDetail``."""
+    return await respond(request, NoteDetail, load_detail, slug=slug)
@@ -0,0 +1,361 @@
+"""Сценарии замеров производительности для ``manage.py benchmark``.
+
+Каждый сценарий получает список размеров данных и возвращает строки
+результатов. Команда выполняет сценарий в транзакции и откатывает её,
+поэтому тестовые данные не остаются в базе.
+"""
+import random
+import statistics
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, connections
+from django.template import engines
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import rendering
+from .db import pool
+from .models import Note
+from .stats import note_count, reconcile
+from .search import get_backend, search_notes
+
+BATCH_SIZE = 5000
+ALPHABET = 'абвгдежзийклмнопрстуфхцчшщъыьэюя'
+SCENARIOS = {}
+
+
+def scenario(default_sizes):
+    """Регистрирует сценарий под именем функции."""
+    def decorator(func):
+        func.default_sizes = default_sizes
+        SCENARIOS[func.__name__] = func
+        return func
+    return decorator
+
+
+def timed(func, repeat=20):
+    """Среднее время вызова ``func`` в миллисекундах."""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return round((time.perf_counter() - started) / repeat * 1000, 2)
+
+
+def create_notes(author, start, stop):
+    """Создаёт заметки автора с номерами из ``range(start, stop)``."""
+    Note.objects.bulk_create(
+        (
+            Note(
+                title=f'Заметка {index}',
+                text='Длинный текст заметки. ' * 100,
+                slug=f'{author.username}-{index}',
+                author=author,
+            )
+            for index in range(start, stop)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+
+def random_words(rng, count):
+    return [
+        ''.join(rng.choices(ALPHABET, k=rng.randint(5, 9)))
+        for _ in range(count)
+    ]
+
+
+def logged_client(username):
+    user, _ = get_user_model().objects.get_or_create(username=username)
+    client = Client()
+    client.force_login(user)
+    return user, client
+
+
+@scenario(default_sizes=(100, 10000, 1000000))
+def notes_list(sizes):
+    """Первая и последняя страницы списка заметок при росте их числа."""
+    author, client = logged_client('bench')
+    url = reverse('notes:list')
+    rows = []
+    created = 0
+    for size in sizes:
+        create_notes(author, created, size)
+        created = size
+        last_id = Note.objects.filter(author=author).order_by('-id')[1].id
+        rows.append({
+            'notes': size,
+            'first_page_ms': timed(lambda: client.get(url)),
+            'last_page_ms': timed(
+                lambda: client.get(url, {'after': last_id})
+            ),
+        })
+    return rows
+
+
+@scenario(default_sizes=(100, 10000, 1000000))
+def note_dashboard(sizes):
+    """Домашняя страница автора: COUNT(*) против счётчика UserNoteStats."""
+    author, client = logged_client('bench')
+    url = reverse('notes:home')
+    rows = []
+    created = 0
+    for size in sizes:
+        create_notes(author, created, size)
+        created = size
+        # bulk_create обходит сигналы, счётчик выравниваем явно.
+        reconcile([author.pk])
+        rows.append({
+            'notes': size,
+            'count_ms': timed(
+                lambda: Note.objects.filter(author=author).count()
+            ),
+            'counter_ms': timed(lambda: note_count(author)),
+            'page_ms': timed(lambda: client.get(url)),
+        })
+    return rows
+
+
+@scenario(default_sizes=(1000, 100000, 1000000))
+def search(sizes):
+    """Поиск по индексу FTS против сканирования ``icontains``."""
+    rng = random.Random(0)
+    vocabulary = random_words(rng, 5000)
+    author, _ = get_user_model().objects.get_or_create(username='bench')
+    backend = get_backend()
+    query = vocabulary[0]
+    rows = []
+    created = 0
+    for size in sizes:
+        for start in range(created, size, BATCH_SIZE):
+            stop = min(start + BATCH_SIZE, size)
+            Note.objects.bulk_create(
+                Note(
+                    title=' '.join(rng.choices(vocabulary, k=3)),
+                    text=' '.join(rng.choices(vocabulary, k=20)),
+                    slug=f'search-{index}',
+                    author=author,
+                )
+                for index in range(start, stop)
+            )
+            backend.index_many(Note.objects.filter(
+                author=author, slug__in=[
+                    f'search-{index}' for index in range(start, stop)
+                ]
+            ))
+        created = size
+        rows.append({
+            'notes': size,
+            'fts_ms': timed(lambda: search_notes(query, author, 100), 5),
+            'icontains_ms': timed(lambda: list(Note.objects.filter(
+                author=author, text__icontains=query
+            )[:100]), 5),
+        })
+    return rows
+
+
+@scenario(default_sizes=(1000,))
+def connection_pool(sizes):
+    """Цикл запроса списка заметок: новое соединение против пула."""
+    variants = (
+        ('fresh', {'ENGINE': 'django.db.backends.sqlite3'}),
+        ('pooled', {
+            'ENGINE': 'notes.db.sqlite3', 'POOL': settings.DATABASE_POOL,
+        }),
+    )
+    alias = 'pool_bench'
+    rows = []
+    for requests in sizes:
+        for variant, options in variants:
+            with tempfile.TemporaryDirectory() as directory:
+                connections.settings[alias] = {
+                    'NAME': str(Path(directory) / 'db.sqlite3'), **options,
+                }
+                connections.ensure_defaults(alias)
+                connections.prepare_test_settings(alias)
+                try:
+                    call_command('migrate', database=alias, verbosity=0)
+                    author = get_user_model().objects.db_manager(
+                        alias
+                    ).create(username='bench')
+                    notes = Note.objects.using(alias).filter(author=author)
+                    for index in range(settings.NOTES_COUNT_ON_PAGE):
+                        Note(title=f'Заметка {index}', text='Текст',
+                             author=author).save(using=alias)
+                    connection = connections[alias]
+                    connection.close()
+                    before = Counter(pool.stats)
+                    started = time.perf_counter()
+                    for _ in range(requests):
+                        list(notes.only('id', 'slug', 'title').order_by(
+                            'id'
+                        )[:settings.NOTES_COUNT_ON_PAGE + 1])
+                        # Так соединение закрывает request_finished.
+                        connection.close_if_unusable_or_obsolete()
+                    elapsed = time.perf_counter() - started
+                    used = pool.stats - before
+                finally:
+                    connections[alias].close()
+                    del connections[alias]
+                    connections.settings.pop(alias)
+                    if alias in pool.pools:
+                        pool.pools.pop(alias).close_all()
+            rows.append({
+                'requests': requests,
+                'variant': variant,
+                'us_per_request': round(elapsed / requests * 1e6),
+                'pool_hits': used['hits'],
+            })
+    return rows
+
+
+def percentile(values, fraction):
+    """Перцентиль по ближайшему рангу для отсортированного списка."""
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def url_requests(user):
+    """
+    GET-запрос к каждому маршруту ``notes.urls`` на данных из базы.
+
+    Заметка для правки и удаления создаётся от имени ``user``, поэтому
+    вызывать внутри откатываемой транзакции.
+    """
+    note = Note.objects.create(
+        title='Заметка для замера', text='Текст', author=user
+    )
+    return {
+        'notes:home': (reverse('notes:home'), {}),
+        'notes:add': (reverse('notes:add'), {}),
+        'notes:edit': (reverse('notes:edit', args=(note.slug,)), {}),
+        'notes:detail': (reverse('notes:detail', args=(note.slug,)), {}),
+        'notes:delete': (reverse('notes:delete', args=(note.slug,)), {}),
+        'notes:list': (reverse('notes:list'), {}),
+        'notes:export': (reverse('notes:export'), {}),
+        'notes:search': (reverse('notes:search'), {'q': 'заметка'}),
+        'notes:success': (reverse('notes:success'), {}),
+        'notes:metrics': (reverse('notes:metrics'), {}),
+    }
+
+
+def measure_urls(client, requests, repeat):
+    """Перцентили времени ответа и число SQL-запросов по маршрутам."""
+    rows = {}
+    for name, (url, params) in requests.items():
+        client.get(url, params)
+        timings = []
+        queries = 0
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(url, params)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                timings.append((time.perf_counter() - started) * 1000)
+            assert response.status_code < 400, (name, response.status_code)
+            queries = max(queries, len(captured))
+        timings.sort()
+        rows[name] = {
+            'p50_ms': round(percentile(timings, 0.5), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+            'p99_ms': round(percentile(timings, 0.99), 2),
+            'queries': queries,
+        }
+    return rows
+
+
+def compare_urls(baseline, current, tolerance, slack_ms=1):
+    """
+    Регрессии относительно базовой линии.
+
+    Число запросов не должно расти вовсе, медиана — больше чем в
+    ``1 + tolerance`` раз и не меньше чем на ``slack_ms``: на
+    маршрутах быстрее миллисекунды иначе срабатывает шум. p95 и p99
+    на десятках запросов слишком шумные, они только для отчёта.
+    """
+    regressions = []
+    for name, row in current.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if row['queries'] > base['queries']:
+            regressions.append(
+                f'{name}: запросов {base["queries"]} -> {row["queries"]}'
+            )
+        limit = max(base['p50_ms'] * (1 + tolerance),
+                    base['p50_ms'] + slack_ms)
+        if row['p50_ms'] > limit:
+            regressions.append(
+                f'{name}: p50 {base["p50_ms"]} -> {row["p50_ms"]} мс'
+            )
+    return regressions
+
+
+def uncached_templates():
+    """Настройка TEMPLATES без кэширующего загрузчика."""
+    templates = [dict(backend) for backend in settings.TEMPLATES]
+    for backend in templates:
+        options = backend['OPTIONS'] = dict(backend['OPTIONS'])
+        options['loaders'] = [
+            loader for name, loaders in options['loaders']
+            for loader in loaders
+        ]
+    return templates
+
+
+@scenario(default_sizes=(20,))
+def template_render(sizes):
+    """
+    Стоимость шаблонов по маршрутам: без кэша загрузчика и с ним.
+
+    ``first_ms`` — первый запрос после сброса кэша без прогрева,
+    ``warm_first_ms`` — после ``rendering.warm_up``; ``render_ms`` —
+    медиана собственного времени шаблонов страницы, ``top`` — самый дорогой.
+    """
+    user = get_user_model().objects.create(username='render', is_staff=True)
+    create_notes(user, 0, 50)
+    requests = url_requests(user)
+    client = Client(HTTP_HOST='localhost')
+    client.force_login(user)
+
+    def first_request(name, warm):
+        engines['django'].engine.template_loaders[0].reset()
+        if warm:
+            rendering.warm_up()
+        url, params = requests[name]
+        started = time.perf_counter()
+        client.get(url, params)
+        return round((time.perf_counter() - started) * 1000, 2)
+
+    rows = []
+    for repeat in sizes:
+        with override_settings(TEMPLATES=uncached_templates()):
+            uncached = measure_urls(client, requests, repeat)
+        cached = measure_urls(client, requests, repeat)
+        for name, (url, params) in requests.items():
+            renders = [
+                client.get(url, params).wsgi_request.query_timer.templates
+                for _ in range(repeat)
+            ]
+            templates = renders[-1]
+            if not templates:
+                continue
+            top = max(templates, key=templates.get)
+            rows.append({
+                'view': name,
+                'uncached_ms': uncached[name]['p50_ms'],
+                'cached_ms': cached[name]['p50_ms'],
+                'render_ms': round(statistics.median(
+                    sum(render.values()) for render in renders
+                ) * 1000, 2),
+                'first_ms': first_request(name, warm=False),
+                'warm_first_ms': first_request(name, warm=True),
+                'top': f'{top} {templates[top] * 1000:.2f}',
+            })
+    return rows
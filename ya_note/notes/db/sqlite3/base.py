@@ -0,0 +1,12 @@
+from django.db.backends.sqlite3 import base
+
+from ..pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+
+    def get_pool(self):
+        # База в памяти живёт, пока открыто её соединение; пул не нужен.
+        if self.is_in_memory_db():
+            return None
+        return super().get_pool()
@@ -0,0 +1,249 @@
+"""
+Замеры запросов к базе и времени ответа по каждому маршруту.
+
+``InstrumentationMiddleware`` считает для запроса число SQL-запросов,
+время в базе, время отрисовки шаблона и общее время и складывает их
+в ``collector``. Для каждого имени маршрута хранится скользящая
+гистограмма постоянного размера, поэтому память не растёт с числом
+запросов. Превышение бюджета запросов из настройки ``QUERY_BUDGETS``
+пишется в лог. Время отрисовки отдельных шаблонов (см. notes/rendering.py)
+складывается в ``template_collector`` по именам шаблонов.
+"""
+import logging
+import math
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.utils.deprecation import MiddlewareMixin
+
+logger = logging.getLogger(__name__)
+
+METRICS = ('queries', 'db_ms', 'render_ms', 'total_ms')
+TEMPLATE_METRICS = ('render_ms',)
+
+# Замер текущего запроса. Под ASGI запросы делят один поток и одно
+# соединение, поэтому замер берётся из контекста, а не из соединения.
+current_timer = ContextVar('query_timer', default=None)
+
+
+class Histogram:
+    """
+    Гистограмма с логарифмическими корзинами постоянного числа.
+
+    Соседние границы отличаются в ``GROWTH`` раз, поэтому перцентили
+    получаются с относительной погрешностью не больше 10%.
+    """
+
+    BASE = 0.01
+    GROWTH = 1.1
+    SIZE = 256
+
+    def __init__(self):
+        self.buckets = [0] * self.SIZE
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        if value <= self.BASE:
+            index = 0
+        else:
+            index = min(
+                self.SIZE - 1,
+                int(math.log(value / self.BASE, self.GROWTH)) + 1,
+            )
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def merge(self, other):
+        for index, count in enumerate(other.buckets):
+            self.buckets[index] += count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, fraction):
+        """Верхняя граница корзины, в которую попал перцентиль."""
+        target = math.ceil(fraction * self.count)
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= target:
+                return min(self.max, self.BASE * self.GROWTH ** index)
+        return 0.0
+
+    def summary(self):
+        return {
+            'p50': round(self.percentile(0.5), 2),
+            'p90': round(self.percentile(0.9), 2),
+            'p99': round(self.percentile(0.99), 2),
+            'max': round(self.max, 2),
+            'mean': round(self.total / self.count, 2) if self.count else 0,
+        }
+
+
+class RollingHistogram:
+    """Гистограмма за последние ``windows × window_seconds`` секунд."""
+
+    def __init__(self, windows=6, window_seconds=10):
+        self.window_seconds = window_seconds
+        self.slices = [Histogram() for _ in range(windows)]
+        self.ticks = [None] * windows
+
+    def tick(self, now=None):
+        if now is None:
+            now = time.monotonic()
+        return int(now // self.window_seconds)
+
+    def add(self, value, now=None):
+        tick = self.tick(now)
+        index = tick % len(self.slices)
+        if self.ticks[index] != tick:
+            self.slices[index] = Histogram()
+            self.ticks[index] = tick
+        self.slices[index].add(value)
+
+    def merged(self, now=None):
+        tick = self.tick(now)
+        result = Histogram()
+        for slice_tick, histogram in zip(self.ticks, self.slices):
+            if slice_tick is not None and tick - slice_tick < len(self.ticks):
+                result.merge(histogram)
+        return result
+
+
+class Collector:
+    """Скользящие гистограммы метрик по именам маршрутов."""
+
+    def __init__(self, metrics=METRICS):
+        self.metrics = metrics
+        self.views = {}
+
+    def record(self, view_name, **values):
+        histograms = self.views.get(view_name)
+        if histograms is None:
+            histograms = self.views.setdefault(
+                view_name,
+                {metric: RollingHistogram() for metric in self.metrics},
+            )
+        for metric, value in values.items():
+            histograms[metric].add(value)
+
+    def snapshot(self):
+        result = {}
+        for view_name, histograms in list(self.views.items()):
+            merged = {
+                metric: histogram.merged()
+                for metric, histogram in histograms.items()
+            }
+            result[view_name] = {
+                'count': merged[self.metrics[-1]].count,
+                **{
+                    metric: histogram.summary()
+                    for metric, histogram in merged.items()
+                },
+            }
+        return result
+
+    def clear(self):
+        self.views.clear()
+
+
+collector = Collector()
+template_collector = Collector(TEMPLATE_METRICS)
+
+
+class QueryTimer:
+    """Обёртка выполнения SQL: считает запросы и время в базе."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.count = 0
+        self.duration = 0.0
+        self.render_started = None
+        self.render_duration = 0.0
+        # Собственное время отрисовки по шаблонам и стек открытых
+        # шаблонов: [начало, время вложенных].
+        self.templates = {}
+        self.template_stack = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+    def render_finished(self, response):
+        self.render_duration = time.perf_counter() - self.render_started
+
+    def template_started(self):
+        self.template_stack.append([time.perf_counter(), 0.0])
+
+    def template_finished(self, name):
+        started, nested = self.template_stack.pop()
+        elapsed = time.perf_counter() - started
+        if self.template_stack:
+            self.template_stack[-1][1] += elapsed
+        self.templates[name] = self.templates.get(name, 0.0) + elapsed - nested
+
+
+def record_query(execute, sql, params, many, context):
+    """Постоянная обёртка соединения: передаёт запрос замеру контекста."""
+    timer = current_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+class InstrumentationMiddleware(MiddlewareMixin):
+    """
+    Замеряет запрос и пишет результат в ``collector``.
+
+    Работает и под ASGI: хуки выполняются в потоке через
+    ``sync_to_async``, который переносит значение ``current_timer`` в
+    контекст запроса.
+    """
+
+    def process_request(self, request):
+        for connection in connections.all():
+            if record_query not in connection.execute_wrappers:
+                connection.execute_wrappers.append(record_query)
+        request.query_timer = QueryTimer()
+        current_timer.set(request.query_timer)
+
+    def process_response(self, request, response):
+        timer = request.query_timer
+        current_timer.set(None)
+        total = time.perf_counter() - timer.started
+        match = request.resolver_match
+        if match is None:
+            return response
+        collector.record(
+            match.view_name,
+            queries=timer.count,
+            db_ms=timer.duration * 1000,
+            render_ms=timer.render_duration * 1000,
+            total_ms=total * 1000,
+        )
+        for name, duration in timer.templates.items():
+            template_collector.record(name, render_ms=duration * 1000)
+        budget = settings.QUERY_BUDGETS.get(match.view_name)
+        if budget is not None and timer.count > budget:
+            logger.warning(
+                'Маршрут %s выполнил %d SQL-запросов при бюджете %d.',
+                match.view_name, timer.count, budget,
+            )
+        return response
+
+    def process_template_response(self, request, response):
+        """Засекает отрисовку: шаблон рендерится сразу после этого хука."""
+        timer = request.query_timer
+        timer.render_started = time.perf_counter()
+        response.add_post_render_callback(timer.render_finished)
+        return response
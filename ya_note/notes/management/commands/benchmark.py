@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from notes.benchmarks import SCENARIOS
+
+
+class Command(BaseCommand):
+    help = 'Запускает сценарий замера производительности.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenario', choices=sorted(SCENARIOS))
+        parser.add_argument(
+            '--sizes', nargs='+', type=int,
+            help='Размеры данных, по умолчанию заданы в сценарии.'
+        )
+
+    def handle(self, *args, **options):
+        func = SCENARIOS[options['scenario']]
+        sizes = options['sizes'] or func.default_sizes
+        with transaction.atomic():
+            rows = func(sizes)
+            transaction.set_rollback(True)
+        for row in rows:
+            self.stdout.write(
+                '  '.join(f'{key}={value}' for key, value in row.items())
+            )
@@ -0,0 +1,73 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client, override_settings
+
+from notes import urls
+from notes.benchmarks import compare_urls, measure_urls, url_requests
+from notes.models import Note
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет все маршруты notes.urls через тестовый клиент и '
+        'сравнивает перцентили и число запросов с базовой линией.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Запросов на маршрут.')
+        parser.add_argument('--save', help='Записать результат в JSON.')
+        parser.add_argument('--baseline', help='JSON прошлого прогона.')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Допустимый рост медианы, доля.')
+
+    def handle(self, *args, **options):
+        # Замеряем от имени автора последней заметки: его список и
+        # выгрузка не пустые.
+        note = Note.objects.select_related('author').order_by('-pk').first()
+        if note is None:
+            raise CommandError('База пуста, сначала запустите seed.')
+        data = {'notes': Note.objects.count()}
+        with transaction.atomic():
+            user = note.author
+            user.is_staff = True
+            user.save(update_fields=('is_staff',))
+            client = Client()
+            client.force_login(user)
+            requests = url_requests(user)
+            missing = {
+                f'{urls.app_name}:{pattern.name}'
+                for pattern in urls.urlpatterns
+            } - set(requests)
+            if missing:
+                raise CommandError(
+                    f'Нет запроса для маршрутов: {", ".join(sorted(missing))}'
+                )
+            # Вне тестового раннера хост тестового клиента не разрешён.
+            with override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']
+            ):
+                rows = measure_urls(client, requests, options['requests'])
+            transaction.set_rollback(True)
+        for name, row in rows.items():
+            self.stdout.write(f'{name}  ' + '  '.join(
+                f'{key}={value}' for key, value in row.items()
+            ))
+        if options['save']:
+            with open(options['save'], 'w', encoding='utf-8') as file:
+                json.dump({'data': data, 'urls': rows}, file, indent=2)
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)
+            if baseline['data'] != data:
+                self.stderr.write(
+                    f'Данные отличаются от базовых: {baseline["data"]}'
+                )
+            regressions = compare_urls(
+                baseline['urls'], rows, options['tolerance']
+            )
+            if regressions:
+                raise CommandError('\n'.join(regressions))
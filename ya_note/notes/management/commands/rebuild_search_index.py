@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from notes.models import Note
+from notes.search import get_backend
+
+CHUNK_SIZE = 2000
+
+
+class Command(BaseCommand):
+    help = 'Заново индексирует все заметки для полнотекстового поиска.'
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        notes = Note.objects.only('id', 'title', 'text', 'author_id')
+        chunk = []
+        total = 0
+        with transaction.atomic():
+            backend.clear()
+            for note in notes.iterator(chunk_size=CHUNK_SIZE):
+                chunk.append(note)
+                if len(chunk) == CHUNK_SIZE:
+                    backend.index_many(chunk)
+                    total += len(chunk)
+                    chunk = []
+            backend.index_many(chunk)
+            total += len(chunk)
+        self.stdout.write(f'Проиндексировано заметок: {total}')
@@ -0,0 +1,34 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from notes.stats import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Сверяет счётчики заметок пользователей с самими заметками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько пользователей сверять в одной транзакции.'
+        )
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.order_by('pk')
+        last_pk = None
+        checked = fixed = 0
+        while True:
+            batch = users if last_pk is None else users.filter(pk__gt=last_pk)
+            ids = list(batch.values_list('pk', flat=True)[
+                :options['batch_size']
+            ])
+            if not ids:
+                break
+            with transaction.atomic():
+                fixed += reconcile(ids)
+            checked += len(ids)
+            last_pk = ids[-1]
+        self.stdout.write(
+            f'Проверено пользователей: {checked}, исправлено: {fixed}'
+        )
@@ -0,0 +1,150 @@
+"""
+Воспроизводимые синтетические данные для нагрузочных замеров.
+
+Один и тот же ``--seed`` даёт тех же пользователей и те же заметки.
+Первичные ключи назначаются заранее, поэтому заметки пишутся пачками
+через ``executemany`` в обход ORM и без чтения обратно, в поиск
+индексируются те же строки, а в памяти одновременно лежит не больше
+одной пачки — так можно набрать десятки миллионов строк. Сигналы при
+этом не срабатывают: счётчики ``UserNoteStats`` пишутся сразу готовыми.
+Ключи берутся после текущего максимума: параллельные вставки во время
+работы команды недопустимы.
+"""
+import random
+from collections import namedtuple
+from itertools import count, islice
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+
+from notes.benchmarks import random_words
+from notes.models import Note, UserNoteStats
+from notes.search import get_backend
+
+VOCABULARY_SIZE = 5000
+TITLE_LENGTH = Note._meta.get_field('title').max_length
+
+# Строки вставки; поиск индексирует их так же, как модели: по pk и полям.
+NoteRow = namedtuple('NoteRow', 'pk slug title text author_id')
+
+
+def next_id(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+def insert(cursor, model, fields, rows):
+    """Пачка строк одним executemany: без моделей и компилятора ORM."""
+    quote = connection.ops.quote_name
+    columns = ', '.join(
+        quote((model._meta.pk if name == 'pk' else
+               model._meta.get_field(name)).column)
+        for name in fields
+    )
+    cursor.executemany(
+        f'INSERT INTO {quote(model._meta.db_table)} ({columns}) '
+        f'VALUES ({", ".join(["%s"] * len(fields))})',
+        list(rows),
+    )
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'Заполняет базу воспроизводимыми синтетическими данными.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--notes-per-user', type=int, default=100)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--password', default='password',
+            help='Пароль всех созданных пользователей.'
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['batch_size'] < 1:
+            raise CommandError(
+                'Нужны хотя бы один пользователь и положительная пачка.'
+            )
+        self.rng = random.Random(options['seed'])
+        self.vocabulary = random_words(self.rng, VOCABULARY_SIZE)
+        self.batch_size = options['batch_size']
+        self.prefix = f'seed{options["seed"]}-'
+        User = get_user_model()
+        if User.objects.filter(username__startswith=self.prefix).exists():
+            raise CommandError(
+                f'Данные с --seed {options["seed"]} уже есть в базе.'
+            )
+        started = perf_counter()
+        user_ids = self.create_users(
+            options['users'], options['password'], options['notes_per_user']
+        )
+        notes = self.create_notes(options['notes_per_user'], user_ids)
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                no_style(), [User, Note]
+            ):
+                cursor.execute(sql)
+        elapsed = perf_counter() - started
+        total = len(user_ids) + notes
+        self.stdout.write(
+            f'Пользователей: {len(user_ids)}, заметок: {notes}, '
+            f'{total / elapsed if elapsed else 0:.0f} строк/с'
+        )
+
+    def sentence(self, low, high):
+        return ' '.join(
+            self.rng.choices(self.vocabulary, k=self.rng.randint(low, high))
+        )
+
+    def create_users(self, number, password, notes_per_user):
+        User = get_user_model()
+        first = next_id(User)
+        # Хэш пароля считается один раз: он намеренно медленный.
+        password = make_password(password)
+        users = (
+            User(id=first + index, username=f'{self.prefix}{index}',
+                 password=password)
+            for index in range(number)
+        )
+        for batch in batched(users, self.batch_size):
+            with transaction.atomic():
+                User.objects.bulk_create(batch)
+                if notes_per_user:
+                    UserNoteStats.objects.bulk_create(
+                        UserNoteStats(user=user, note_count=notes_per_user)
+                        for user in batch
+                    )
+        return range(first, first + number)
+
+    def create_notes(self, notes_per_user, user_ids):
+        backend = get_backend()
+        note_ids = count(next_id(Note))
+        notes = (
+            NoteRow(
+                next(note_ids),
+                f'{self.prefix}{index}-{number}',
+                self.sentence(2, 6)[:TITLE_LENGTH],
+                self.sentence(20, 80),
+                user_id,
+            )
+            for index, user_id in enumerate(user_ids)
+            for number in range(notes_per_user)
+        )
+        created = 0
+        for batch in batched(notes, self.batch_size):
+            with transaction.atomic(), connection.cursor() as cursor:
+                insert(cursor, Note, NoteRow._fields, batch)
+                backend.index_many(batch)
+            created += len(batch)
+        return created
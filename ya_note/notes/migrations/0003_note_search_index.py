@@ -0,0 +1,44 @@
+from django.db import migrations
+
+SQLITE_CREATE = (
+    'CREATE VIRTUAL TABLE notes_note_fts '
+    'USING fts5(title, text, author_id UNINDEXED)',
+)
+POSTGRES_CREATE = (
+    'CREATE TABLE notes_note_search ('
+    'note_id bigint PRIMARY KEY REFERENCES notes_note (id) '
+    'ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, '
+    'author_id bigint NOT NULL, '
+    'document tsvector NOT NULL)',
+    'CREATE INDEX notes_note_search_document_idx '
+    'ON notes_note_search USING GIN (document)',
+)
+DROP = {
+    'sqlite': ('DROP TABLE notes_note_fts',),
+    'postgresql': ('DROP TABLE notes_note_search',),
+}
+
+
+def create_search_index(apps, schema_editor):
+    statements = {
+        'sqlite': SQLITE_CREATE,
+        'postgresql': POSTGRES_CREATE,
+    }.get(schema_editor.connection.vendor, ())
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    for statement in DROP.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0002_note_author_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
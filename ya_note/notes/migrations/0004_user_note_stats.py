@@ -0,0 +1,46 @@
+# Generated by Django 3.2.15 on 2026-10-18 18:10
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def fill_stats(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    Note = apps.get_model('notes', 'Note')
+    UserNoteStats = apps.get_model('notes', 'UserNoteStats')
+    counts = (
+        Note.objects.using(alias).order_by()
+        .values_list('author').annotate(count=Count('id'))
+    )
+    UserNoteStats.objects.using(alias).bulk_create(
+        (
+            UserNoteStats(user_id=user_id, note_count=count)
+            for user_id, count in counts.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('notes', '0003_note_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserNoteStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='note_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('note_count', models.IntegerField(default=0, verbose_name='Заметок')),
+            ],
+            options={
+                'verbose_name': 'Счётчики заметок',
+                'verbose_name_plural': 'Счётчики заметок',
+            },
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
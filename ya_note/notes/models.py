@@ -1,7 +1,11 @@
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, models, router, transaction
 
-from pytils.translit import slugify
+from .slugs import DEFAULT_SLUG, next_free_slug, slugify_title
+
+# Сколько раз пробуем вставить заметку, если свободный slug
+# успели занять параллельным запросом.
+SLUG_ATTEMPTS = 10
 
 
 class Note(models.Model):
@@ -28,11 +32,58 @@ class Note(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        indexes = (
+            models.Index(fields=('author', 'id'), name='note_author_id_idx'),
+        )
+
     def __str__(self):
         return self.title
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            max_slug_length = self._meta.get_field('slug').max_length
-            self.slug = slugify(self.title)[:max_slug_length]
-        super().save(*args, **kwargs)
+        if self.slug:
+            super().save(*args, **kwargs)
+            return
+        # Берём первый свободный slug и сразу вставляем заметку;
+        # если его заняли параллельно, уникальный индекс вернёт
+        # IntegrityError, и мы выберем следующий.
+        using = kwargs.get('using') or router.db_for_write(
+            type(self), instance=self
+        )
+        others = type(self)._default_manager.using(using).exclude(pk=self.pk)
+        max_slug_length = self._meta.get_field('slug').max_length
+        base = slugify_title(self.title)[:max_slug_length] or DEFAULT_SLUG
+        for attempt in range(SLUG_ATTEMPTS):
+            self.slug = next_free_slug(others, base, max_slug_length)
+            try:
+                with transaction.atomic(using=using):
+                    super().save(*args, **kwargs)
+                return
+            except IntegrityError:
+                if attempt == SLUG_ATTEMPTS - 1:
+                    raise
+
+
+class UserNoteStats(models.Model):
+    """
+    Счётчики заметок пользователя, которые ведут сигналы ``Note``.
+
+    Расхождения после массовых операций в обход сигналов исправляет
+    команда ``reconcile_note_stats``.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='note_stats',
+    )
+    # Не PositiveIntegerField: уменьшение счётчика, который уже разошёлся
+    # с реальностью, не должно ломать удаление заметки.
+    note_count = models.IntegerField('Заметок', default=0)
+
+    class Meta:
+        verbose_name_plural = 'Счётчики заметок'
+        verbose_name = 'Счётчики заметок'
+
+    def __str__(self):
+        return f'{self.user}: {self.note_count}'
@@ -0,0 +1,12 @@
+"""Разбор курсоров keyset-пагинации заметок."""
+
+# Наибольший целый ключ, который принимает SQLite.
+MAX_ID = 2 ** 63 - 1
+
+
+def parse_id(value):
+    """Целый ключ из строки; вне диапазона ключей базы — ValueError."""
+    pk = int(value)
+    if not 0 < pk <= MAX_ID:
+        raise ValueError(f'Ключ вне допустимого диапазона: {value}')
+    return pk
@@ -0,0 +1,78 @@
+"""
+Кэш скомпилированных шаблонов, прогрев и замер отрисовки по шаблонам.
+
+``Loader`` — кэширующий загрузчик Django: шаблон разбирается один раз
+на процесс, а не на каждый запрос, как без него при ``DEBUG = True``.
+Под runserver Django сам сбрасывает кэш при изменении файлов шаблонов.
+Загруженные им шаблоны пишут время своей отрисовки в замер текущего
+запроса (см. notes/instrumentation.py): время вложенных ``include`` и
+родителей из ``extends`` вычитается, поэтому сумма по шаблонам равна
+времени отрисовки страницы.
+
+``warm_up`` компилирует все шаблоны каталогов ``DIRS`` при старте
+процесса, чтобы первые запросы не платили за разбор.
+"""
+import logging
+import time
+from pathlib import Path
+
+from django.template import Template, TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+from django.template.loaders import cached
+
+from .instrumentation import current_timer
+
+logger = logging.getLogger(__name__)
+
+
+class TimedTemplate(Template):
+    """Шаблон, который пишет время своей отрисовки в замер запроса."""
+
+    def _render(self, context):
+        timer = current_timer.get()
+        if timer is None:
+            return super()._render(context)
+        timer.template_started()
+        try:
+            return super()._render(context)
+        finally:
+            timer.template_finished(self.origin.template_name)
+
+
+class Loader(cached.Loader):
+    """Кэширующий загрузчик, шаблоны которого замеряют отрисовку."""
+
+    def get_template(self, template_name, skip=None):
+        template = super().get_template(template_name, skip)
+        if type(template) is Template:
+            template.__class__ = TimedTemplate
+        return template
+
+
+def template_names(engine):
+    for directory in engine.dirs:
+        directory = Path(directory)
+        for path in sorted(directory.rglob('*')):
+            if path.is_file():
+                yield path.relative_to(directory).as_posix()
+
+
+def warm_up():
+    """Компилирует все шаблоны из ``DIRS``; возвращает их число."""
+    started = time.perf_counter()
+    compiled = 0
+    for backend in engines.all():
+        if not isinstance(backend, DjangoTemplates):
+            continue
+        for name in template_names(backend.engine):
+            try:
+                backend.engine.get_template(name)
+            except TemplateSyntaxError:
+                logger.exception('Шаблон %s не компилируется.', name)
+            else:
+                compiled += 1
+    logger.info(
+        'Скомпилировано шаблонов: %d за %.1f мс.',
+        compiled, (time.perf_counter() - started) * 1000,
+    )
+    return compiled
@@ -0,0 +1,31 @@
+"""
+Маршрутизация запросов между основной базой и копией для чтения.
+
+Чтения уходят на псевдоним ``replica``, если он настроен, запись —
+на ``default``. Внутри транзакции основной базы чтения остаются на
+ней, иначе они не увидели бы ещё не зафиксированные изменения.
+"""
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA = 'replica'
+
+
+class ReadReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if (
+            REPLICA not in settings.DATABASES
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db != REPLICA
@@ -0,0 +1,146 @@
+"""
+Полнотекстовый поиск по заметкам.
+
+В SQLite индекс — виртуальная таблица FTS5, в которую пишутся основы
+слов (стеммер Snowball для русского языка); в PostgreSQL — таблица
+со столбцом tsvector в конфигурации ``russian`` и GIN-индексом.
+Оба бэкенда реализуют один интерфейс, индекс обновляется сигналами
+модели ``Note``.
+"""
+import re
+from functools import lru_cache
+
+import snowballstemmer
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+
+from .models import Note
+
+WORD = re.compile(r'\w+')
+stemmer = snowballstemmer.stemmer('russian')
+
+
+@lru_cache(maxsize=100000)
+def stem_word(word):
+    """Основа слова; словарь текстов невелик, поэтому основы кэшируются."""
+    return stemmer.stemWord(word)
+
+
+def stem_text(text):
+    """Заменяет слова текста их основами."""
+    words = WORD.findall(text.lower().replace('ё', 'е'))
+    return ' '.join(map(stem_word, words))
+
+
+class SQLiteBackend:
+    table = 'notes_note_fts'
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def index_many(self, notes):
+        rows = [
+            (note.pk, stem_text(note.title), stem_text(note.text),
+             note.author_id)
+            for note in notes
+        ]
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {self.table} WHERE rowid = %s',
+                [(row[0],) for row in rows],
+            )
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, title, text, author_id) '
+                'VALUES (%s, %s, %s, %s)',
+                rows,
+            )
+
+    def remove(self, note_id):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid = %s', [note_id]
+            )
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+
+    def search(self, query, author_id, limit):
+        terms = stem_text(query).split()
+        if not terms:
+            return []
+        # Каждая основа в кавычках, чтобы не разбирать синтаксис FTS5.
+        match = ' '.join(f'"{term}"' for term in terms)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {self.table} '
+                f'WHERE {self.table} MATCH %s AND author_id = %s '
+                f'ORDER BY bm25({self.table}, 10.0, 1.0) LIMIT %s',
+                [match, author_id, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresBackend:
+    table = 'notes_note_search'
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def index_many(self, notes):
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {self.table} (note_id, author_id, document) '
+                "VALUES (%s, %s, setweight(to_tsvector('russian', %s), 'A')"
+                " || to_tsvector('russian', %s)) "
+                'ON CONFLICT (note_id) DO UPDATE SET '
+                'author_id = EXCLUDED.author_id, document = EXCLUDED.document',
+                [
+                    (note.pk, note.author_id, note.title, note.text)
+                    for note in notes
+                ],
+            )
+
+    def remove(self, note_id):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE note_id = %s', [note_id]
+            )
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+
+    def search(self, query, author_id, limit):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT note_id FROM {self.table}, '
+                "plainto_tsquery('russian', %s) query "
+                'WHERE author_id = %s AND document @@ query '
+                'ORDER BY ts_rank(document, query) DESC LIMIT %s',
+                [query, author_id, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+BACKENDS = {
+    'sqlite': SQLiteBackend,
+    'postgresql': PostgresBackend,
+}
+
+
+def get_backend(using='default'):
+    connection = connections[using]
+    try:
+        return BACKENDS[connection.vendor](connection)
+    except KeyError:
+        raise ImproperlyConfigured(
+            f'Полнотекстовый поиск не поддерживает {connection.vendor}.'
+        )
+
+
+def search_notes(query, author, limit):
+    """Заметки автора, подходящие под запрос, от самых релевантных."""
+    ids = get_backend().search(query, author.pk, limit)
+    notes = Note.objects.in_bulk(ids)
+    return [notes[pk] for pk in ids if pk in notes]
@@ -0,0 +1,26 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import search, stats
+from .models import Note
+
+
+@receiver(post_save, sender=Note)
+def index_note(sender, instance, using, **kwargs):
+    search.get_backend(using).index_many([instance])
+
+
+@receiver(post_delete, sender=Note)
+def remove_note_from_index(sender, instance, using, **kwargs):
+    search.get_backend(using).remove(instance.pk)
+
+
+@receiver(post_save, sender=Note)
+def count_new_note(sender, instance, created, using, **kwargs):
+    if created:
+        stats.note_added(instance.author_id, using)
+
+
+@receiver(post_delete, sender=Note)
+def count_removed_note(sender, instance, using, **kwargs):
+    stats.note_removed(instance.author_id, using)
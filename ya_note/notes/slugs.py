@@ -0,0 +1,44 @@
+"""Подбор свободного slug для заметки."""
+from functools import lru_cache
+
+from django.db.models import Q
+from pytils.translit import slugify
+
+DEFAULT_SLUG = 'note'
+
+
+@lru_cache(maxsize=4096)
+def slugify_title(title):
+    """Транслитерирует заголовок; повторяющиеся заголовки берутся из кэша."""
+    return slugify(title)
+
+
+def next_free_slug(queryset, base, max_length):
+    """
+    Первый свободный slug из ряда ``base``, ``base-2``, ``base-3``…
+
+    Занятые варианты выбираются запросом по диапазону уникального
+    индекса slug: строки, начинающиеся с ``stem-``, лежат между ``stem-``
+    и ``stem.``. Для длинного ``base`` основа ``stem`` обрезается под
+    суффикс и укорачивается с ростом числа его цифр — тогда диапазон
+    новой основы дочитывается ещё одним запросом.
+    """
+    def range_filter(stem):
+        return Q(slug__gte=f'{stem}-', slug__lt=f'{stem}.')
+
+    stem = base[:max_length - len('-2')]
+    taken = set(queryset.filter(
+        Q(slug=base) | range_filter(stem)
+    ).values_list('slug', flat=True))
+    slug = base
+    number = 1
+    while slug in taken:
+        number += 1
+        suffix = f'-{number}'
+        if len(stem) + len(suffix) > max_length:
+            stem = base[:max_length - len(suffix)]
+            taken.update(queryset.filter(
+                range_filter(stem)
+            ).values_list('slug', flat=True))
+        slug = stem + suffix
+    return slug
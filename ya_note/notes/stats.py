@@ -0,0 +1,82 @@
+"""
+Счётчики заметок пользователя без ``COUNT(*)`` на каждый запрос.
+
+Сигналы ``Note`` меняют строку ``UserNoteStats`` одним атомарным
+``UPDATE ... SET note_count = note_count ± 1``, поэтому параллельные
+запросы не теряют приращений. Строка появляется при первой созданной
+заметке и сразу получает настоящее число заметок. Удаление строку не
+создаёт: при каскадном удалении пользователя её уже нет.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Note, UserNoteStats
+
+
+def actual_count():
+    """Подзапрос с настоящим числом заметок пользователя строки."""
+    notes = Note.objects.filter(author=OuterRef('user')).order_by()
+    return Coalesce(
+        Subquery(notes.values('author').annotate(
+            count=Count('id')
+        ).values('count')),
+        Value(0),
+    )
+
+
+def note_added(user_id, using):
+    stats = UserNoteStats.objects.using(using)
+    if stats.filter(user_id=user_id).update(note_count=F('note_count') + 1):
+        return
+    try:
+        with transaction.atomic(using=using):
+            stats.create(
+                user_id=user_id,
+                note_count=Note.objects.using(using).filter(
+                    author_id=user_id
+                ).count(),
+            )
+    except IntegrityError:
+        # Строку только что создал параллельный запрос.
+        stats.filter(user_id=user_id).update(note_count=F('note_count') + 1)
+
+
+def note_removed(user_id, using):
+    UserNoteStats.objects.using(using).filter(user_id=user_id).update(
+        note_count=F('note_count') - 1
+    )
+
+
+def note_count(user):
+    """Число заметок пользователя по счётчику, одним запросом по ключу."""
+    return UserNoteStats.objects.filter(user=user).values_list(
+        'note_count', flat=True
+    ).first() or 0
+
+
+def reconcile(user_ids, using='default'):
+    """
+    Сверяет счётчики пользователей с заметками; возвращает число правок.
+
+    Неверные счётчики исправляются одним ``UPDATE`` с подзапросом, так
+    что приращения параллельных запросов не затираются старым значением.
+    """
+    stats = UserNoteStats.objects.using(using).filter(user_id__in=user_ids)
+    fixed = stats.exclude(note_count=actual_count()).update(
+        note_count=actual_count()
+    )
+    missing = set(user_ids) - set(stats.values_list('user_id', flat=True))
+    counts = dict(
+        Note.objects.using(using).filter(author_id__in=missing).order_by()
+        .values_list('author').annotate(count=Count('id'))
+    )
+    # Пользователям без заметок строка не нужна: note_count вернёт 0.
+    created = UserNoteStats.objects.using(using).bulk_create(
+        (
+            UserNoteStats(user_id=user_id, note_count=count)
+            for user_id, count in counts.items()
+        ),
+        ignore_conflicts=True,
+    )
+    return fixed + len(created)
@@ -0,0 +1,15 @@
+import pytest
+from django.conf import settings
+
+from notes import testing
+
+
+if getattr(settings, 'TEST_DATABASE_TEMPLATE_DIR', None):
+    @pytest.fixture(scope='session')
+    def django_db_setup(django_test_environment, django_db_blocker):
+        """Тестовая база из шаблона вместо миграций, см. notes/testing.py."""
+        with django_db_blocker.unblock():
+            testing.restore_template(
+                testing.build_template(settings.TEST_DATABASE_TEMPLATE_DIR)
+            )
+        yield
@@ -1,9 +1,18 @@
+import gzip
+import json
+import tracemalloc
+from unittest import mock
+
+from asgiref.sync import async_to_sync
 from django.contrib.auth import get_user_model
-from django.test import Client
+from django.contrib.auth.models import AnonymousUser
+from django.template import engines
+from django.test import Client, override_settings
 from django.urls import reverse_lazy
 
 from notes.models import Note
-from notes import forms
+from notes import async_views, export, forms, rendering
+from notes.instrumentation import template_collector
 from notes.tests.test_logic import BaseTestCase
 from notes.tests.constans import TITLE_NOTE, TEXT_NOTE, SLUG_NOTE
 
@@ -28,8 +37,24 @@ class TestContent(BaseTestCase):
                                        author=cls.user)
 
     def setUp(self):
+        super().setUp()
         self.client.force_login(self.user)
 
+    def test_home_shows_note_count_and_recent_notes(self):
+        Note.objects.bulk_create(
+            Note(title=f'Заметка {index}', text=TEXT_NOTE,
+                 slug=f'bulk-{index}', author=self.user)
+            for index in range(10)
+        )
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse_lazy('notes:home'))
+        # bulk_create обходит сигналы: счётчик догонит reconcile_note_stats.
+        self.assertEqual(response.context['note_count'], 1)
+        self.assertEqual(
+            [note.slug for note in response.context['recent_notes']],
+            [f'bulk-{index}' for index in range(9, 4, -1)],
+        )
+
     def test_single_note_passed_to_notes_list(self):
         response = self.client.get(reverse_lazy('notes:list'))
         self.assertEqual(len(response.context['object_list']), 1)
@@ -41,6 +66,111 @@ class TestContent(BaseTestCase):
         response = self.client.get(reverse_lazy('notes:list'))
         self.assertEqual(len(response.context['object_list']), 0)
 
+    @override_settings(NOTES_COUNT_ON_PAGE=1)
+    def test_notes_list_is_paginated_by_id(self):
+        second_note = Note.objects.create(title=TITLE_NOTE, text=TEXT_NOTE,
+                                          author=self.user)
+        response = self.client.get(reverse_lazy('notes:list'))
+        self.assertEqual(response.context['object_list'], [self.note])
+        next_after = response.context['next_after']
+        self.assertEqual(next_after, self.note.id)
+        response = self.client.get(reverse_lazy('notes:list'),
+                                   {'after': next_after})
+        self.assertEqual(response.context['object_list'], [second_note])
+        self.assertIsNone(response.context['next_after'])
+
+    def test_notes_list_defers_text(self):
+        response = self.client.get(reverse_lazy('notes:list'))
+        note = response.context['object_list'][0]
+        self.assertIn('text', note.get_deferred_fields())
+
+    def test_notes_list_rejects_bad_after(self):
+        for after in ('abc', str(10 ** 20)):
+            with self.subTest(after=after):
+                response = self.client.get(reverse_lazy('notes:list'),
+                                           {'after': after})
+                self.assertEqual(response.status_code, 400)
+
+    def test_search_uses_stems_and_ranks_title_first(self):
+        in_text = Note.objects.create(title='Покупки', author=self.user,
+                                      text='Не забыть про новые заметки')
+        in_title = Note.objects.create(title='Заметка о заметках',
+                                       text='Текст', author=self.user)
+        Note.objects.create(title='Заметка', text='Чужая',
+                            author=self.second_user)
+        response = self.client.get(reverse_lazy('notes:search'),
+                                   {'q': 'заметками'})
+        self.assertEqual(response.context['object_list'],
+                         [in_title, in_text])
+
+    def test_deleted_note_is_removed_from_search(self):
+        self.note.delete()
+        response = self.client.get(reverse_lazy('notes:search'),
+                                   {'q': TITLE_NOTE})
+        self.assertEqual(response.context['object_list'], [])
+
+    def test_export_streams_own_notes(self):
+        Note.objects.create(title='Чужая', text=TEXT_NOTE,
+                            author=self.second_user)
+        response = self.client.get(reverse_lazy('notes:export'))
+        self.assertTrue(response.streaming)
+        rows = [json.loads(line) for line in
+                b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(rows, [{'id': self.note.id, 'slug': SLUG_NOTE,
+                                 'title': TITLE_NOTE, 'text': TEXT_NOTE}])
+        response = self.client.get(reverse_lazy('notes:export'),
+                                   {'format': 'csv'},
+                                   HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        content = gzip.decompress(b''.join(response.streaming_content))
+        self.assertEqual(content.decode().splitlines()[0],
+                         'id,slug,title,text')
+        response = self.client.get(reverse_lazy('notes:export'),
+                                   {'format': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+    @mock.patch.object(export, 'CHUNK_SIZE', 100)
+    def test_export_memory_does_not_grow_with_rows(self):
+        # Память ограничена размером пачки чтения, поэтому пачка
+        # уменьшена: оба прогона читают базу многими пачками.
+        def export_peak():
+            response = self.client.get(reverse_lazy('notes:export'))
+            tracemalloc.start()
+            for _ in response.streaming_content:
+                pass
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            return peak
+
+        def add_notes(start, count):
+            Note.objects.bulk_create(
+                Note(title=TITLE_NOTE, text=TEXT_NOTE * 20,
+                     slug=f'export-{index}', author=self.user)
+                for index in range(start, start + count)
+            )
+
+        add_notes(0, 1000)
+        small = export_peak()
+        add_notes(1000, 9000)
+        large = export_peak()
+        self.assertLess(large, small * 1.5)
+
+    def test_async_views_match_sync_pages(self):
+        for view, url, kwargs in (
+            (async_views.notes_list, reverse_lazy('notes:list'), {}),
+            (async_views.note_detail,
+             reverse_lazy('notes:detail', args=(SLUG_NOTE,)),
+             {'slug': SLUG_NOTE}),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                request = response.wsgi_request
+                async_response = async_to_sync(view)(request, **kwargs)
+                self.assertEqual(async_response.content, response.content)
+                request.user = AnonymousUser()
+                async_response = async_to_sync(view)(request, **kwargs)
+                self.assertEqual(async_response.status_code, 302)
+
     def test_forms_passed_to_note_creation_and_editing_pages(self):
         response = self.client.get(reverse_lazy('notes:add'))
         self.assertIn('form', response.context)
@@ -50,3 +180,20 @@ class TestContent(BaseTestCase):
                                     kwargs={'slug': self.note.slug}))
         self.assertIn('form', response.context)
         self.assertIsInstance(response.context['form'], forms.NoteForm)
+
+    def test_render_time_is_split_by_template(self):
+        template_collector.clear()
+        self.client.get(reverse_lazy('notes:detail', args=(self.note.slug,)))
+        snapshot = template_collector.snapshot()
+        self.assertEqual(snapshot['notes/detail.html']['count'], 1)
+        self.assertGreater(snapshot['base.html']['render_ms']['max'], 0)
+
+    def test_warm_up_compiles_every_template(self):
+        engine = engines['django'].engine
+        loader = engine.template_loaders[0]
+        loader.reset()
+        names = list(rendering.template_names(engine))
+        self.assertEqual(rendering.warm_up(), len(names))
+        self.assertIn('notes/list.html', loader.get_template_cache)
+        self.assertIsInstance(engine.get_template('notes/list.html'),
+                              rendering.TimedTemplate)
@@ -1,10 +1,22 @@
+import io
+import json
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.management import CommandError, call_command
+from django.db import connections
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings
+)
 from django.urls import reverse
 from pytils.translit import slugify
 
+from notes import ratelimit, stats, urls
 from notes.forms import WARNING
-from notes.models import Note
+from notes.models import Note, UserNoteStats
+from notes.search import search_notes
 from notes.tests.utils import assert_note_fields_equal
 
 User = get_user_model()
@@ -26,6 +38,9 @@ class BaseTestCase(TestCase):
             'slug': 'new-slug'
         }
 
+    def setUp(self):
+        ratelimit.reset()
+
 
 class TestLogic(BaseTestCase):
 
@@ -39,6 +54,18 @@ class TestLogic(BaseTestCase):
         assert_note_fields_equal(self, new_note, self.form_data)
         self.assertEqual(new_note.author, self.author)
 
+    @override_settings(RATE_LIMITS={'note': (1, 60)})
+    def test_note_burst_gets_429(self):
+        url = reverse('notes:add')
+        self.author_client.post(url, data=self.form_data)
+        response = self.author_client.post(
+            url, data={**self.form_data, 'slug': 'other-slug'},
+            REMOTE_ADDR='10.0.0.2',
+        )
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '60')
+        self.assertFalse(Note.objects.filter(slug='other-slug').exists())
+
     def test_anonymous_user_cant_create_note(self):
         url = reverse('notes:add')
         initial_count = Note.objects.count()
@@ -68,6 +95,77 @@ class TestLogic(BaseTestCase):
         expected_slug = slugify(self.form_data['title'])
         self.assertEqual(new_note.slug, expected_slug)
 
+    def test_empty_slug_gets_free_suffix(self):
+        url = reverse('notes:add')
+        self.form_data.pop('slug')
+        for _ in range(3):
+            self.author_client.post(url, data=self.form_data)
+        expected_slug = slugify(self.form_data['title'])
+        self.assertEqual(
+            set(Note.objects.values_list('slug', flat=True)),
+            {expected_slug, f'{expected_slug}-2', f'{expected_slug}-3'},
+        )
+
+    def test_max_length_title_gets_truncated_free_slugs(self):
+        title = 'a' * Note._meta.get_field('title').max_length
+        # Десятая заметка ещё и укорачивает основу под суффикс -10.
+        slugs = [
+            Note.objects.create(
+                title=title, text='Текст', author=self.author
+            ).slug
+            for _ in range(11)
+        ]
+        self.assertEqual(slugs[:3], [title, title[:98] + '-2',
+                                     title[:98] + '-3'])
+        self.assertEqual(slugs[9:], [title[:97] + '-10', title[:97] + '-11'])
+        self.assertEqual(len(set(slugs)), 11)
+
+
+class TestConcurrentSlugs(TransactionTestCase):
+    """Параллельное создание заметок с одним заголовком в SQLite WAL."""
+
+    alias = 'wal'
+    threads = 8
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        connections.settings[self.alias] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': str(Path(directory.name) / 'db.sqlite3'),
+            'OPTIONS': {'timeout': 20},
+        }
+        connections.ensure_defaults(self.alias)
+        connections.prepare_test_settings(self.alias)
+        self.addCleanup(connections.settings.pop, self.alias)
+        self.addCleanup(connections[self.alias].close)
+        call_command('migrate', database=self.alias, verbosity=0)
+        # Явно, а не через SQLITE_PRAGMAS: быстрый профиль тестов их
+        # урезает, а тест проверяет именно блокировки в WAL.
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode=WAL')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+        self.author = User.objects.db_manager(self.alias).create(
+            username='Автор'
+        )
+
+    def create_note(self, _):
+        try:
+            note = Note(title='Одна и та же', text='Текст',
+                        author=self.author)
+            note.save(using=self.alias)
+            return note.slug
+        finally:
+            connections[self.alias].close()
+
+    def test_concurrent_notes_get_distinct_slugs(self):
+        with ThreadPoolExecutor(self.threads) as executor:
+            slugs = list(executor.map(self.create_note, range(self.threads)))
+        self.assertEqual(len(set(slugs)), self.threads)
+        self.assertEqual(
+            Note.objects.using(self.alias).count(), self.threads
+        )
+
 
 class TestNoteEditDelete(BaseTestCase):
 
@@ -118,3 +216,67 @@ class TestNoteEditDelete(BaseTestCase):
         response = client.post(url)
         self.assertEqual(response.status_code, 404)
         self.assertTrue(Note.objects.exists())
+
+
+class TestNoteStats(BaseTestCase):
+
+    def test_counter_follows_created_and_deleted_notes(self):
+        self.author_client.post(reverse('notes:add'), data=self.form_data)
+        self.author_client.post(
+            reverse('notes:add'), data={**self.form_data, 'slug': 'second'}
+        )
+        self.assertEqual(self.author.note_stats.note_count, 2)
+        self.author_client.post(reverse('notes:delete', args=('second',)))
+        self.assertEqual(stats.note_count(self.author), 1)
+
+    def test_reconcile_repairs_drift_in_batches(self):
+        other = User.objects.create(username='Другой')
+        Note.objects.bulk_create(
+            Note(title='Заметка', text='Текст', slug=f'bulk-{index}',
+                 author=user)
+            for index, user in enumerate((self.author, other, other))
+        )
+        UserNoteStats.objects.create(user=self.author, note_count=7)
+        out = io.StringIO()
+        call_command('reconcile_note_stats', batch_size=1, stdout=out)
+        self.assertIn('исправлено: 2', out.getvalue())
+        self.assertEqual(stats.note_count(self.author), 1)
+        self.assertEqual(stats.note_count(other), 2)
+
+
+class TestSeedAndLoadtest(TestCase):
+
+    def seed(self, **options):
+        call_command('seed', users=2, notes_per_user=3, batch_size=2,
+                     stdout=io.StringIO(), **options)
+        return list(Note.objects.order_by('pk').values_list(
+            'author__username', 'slug', 'title', 'text'
+        ))
+
+    def test_seed_is_reproducible(self):
+        first = self.seed(seed=3)
+        self.assertEqual(len(first), 6)
+        author = User.objects.get(username=first[0][0])
+        self.assertEqual(stats.note_count(author), 3)
+        word = first[0][2].split()[0]
+        self.assertIn(first[0][1], [
+            note.slug for note in search_notes(word, author, 10)
+        ])
+        User.objects.all().delete()
+        self.assertEqual(self.seed(seed=3), first)
+
+    def test_loadtest_flags_regressions_against_baseline(self):
+        self.seed()
+        with tempfile.TemporaryDirectory() as directory:
+            baseline = Path(directory) / 'baseline.json'
+            call_command('loadtest', requests=2, save=str(baseline),
+                         stdout=io.StringIO())
+            data = json.loads(baseline.read_text())
+            self.assertEqual(set(data['urls']), {
+                f'notes:{pattern.name}' for pattern in urls.urlpatterns
+            })
+            data['urls']['notes:list']['queries'] -= 1
+            baseline.write_text(json.dumps(data))
+            with self.assertRaisesRegex(CommandError, 'notes:list: запросов'):
+                call_command('loadtest', requests=2, baseline=str(baseline),
+                             stdout=io.StringIO())
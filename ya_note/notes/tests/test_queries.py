@@ -0,0 +1,57 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from notes import urls
+from notes.models import Note
+from notes.tests.test_logic import BaseTestCase
+
+# Число SQL-запросов на каждый маршрут notes.urls. Авторизованный клиент
+# тратит два запроса на сессию и пользователя; создание и удаление
+# заметки — ещё один на счётчик UserNoteStats. Автор в этих тестах —
+# сотрудник, чтобы видеть метрики.
+BUDGETS = (
+    ('get', 'notes:home', False, None, 4),
+    ('get', 'notes:success', False, None, 2),
+    ('get', 'notes:list', False, None, 3),
+    ('get', 'notes:search', False, {'q': 'заголовок'}, 4),
+    ('get', 'notes:add', False, None, 2),
+    ('post', 'notes:add', False, 'form_data', 8),
+    ('get', 'notes:detail', True, None, 3),
+    ('get', 'notes:edit', True, None, 3),
+    ('post', 'notes:edit', True, 'form_data', 8),
+    ('get', 'notes:delete', True, None, 3),
+    ('post', 'notes:delete', True, None, 6),
+    ('get', 'notes:export', False, None, 3),
+    ('get', 'notes:metrics', False, None, 2),
+)
+
+
+class TestQueryBudgets(BaseTestCase):
+
+    def test_query_budgets(self):
+        type(self.author).objects.filter(pk=self.author.pk).update(
+            is_staff=True
+        )
+        for method, name, by_slug, data, budget in BUDGETS:
+            note = Note.objects.create(title='Заголовок', text='Текст',
+                                       author=self.author)
+            args = (note.slug,) if by_slug else None
+            if data == 'form_data':
+                data = {**self.form_data, 'slug': f'new-{note.pk}'}
+            with self.subTest(method=method, name=name):
+                with CaptureQueriesContext(connection) as queries:
+                    response = getattr(self.author_client, method)(
+                        reverse(name, args=args), data=data
+                    )
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                self.assertLess(response.status_code, 400)
+                self.assertEqual(
+                    len(queries), budget,
+                    '\n'.join(query['sql'] for query in queries),
+                )
+
+    def test_every_route_has_a_budget(self):
+        names = {f'notes:{pattern.name}' for pattern in urls.urlpatterns}
+        self.assertEqual(names, {name for _, name, *_ in BUDGETS})
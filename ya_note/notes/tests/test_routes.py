@@ -47,7 +47,8 @@ class TestRoutes(BaseTestCase):
         pages = [
             {'url': reverse('notes:add'), 'expected_status': 200},
             {'url': reverse('notes:success'), 'expected_status': 200},
-            {'url': reverse('notes:list'), 'expected_status': 200}
+            {'url': reverse('notes:list'), 'expected_status': 200},
+            {'url': reverse('notes:search'), 'expected_status': 200},
         ]
 
         for page in pages:
@@ -76,9 +77,22 @@ class TestRoutes(BaseTestCase):
                     response = self.client.get(url)
                     self.assertEqual(response.status_code, status)
 
+    def test_metrics_only_for_staff(self):
+        url = reverse('notes:metrics')
+        self.user_client.get(reverse('notes:list'))
+        response = self.user_client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+        staff = User.objects.create(username='Админ', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIn('notes:list', response.json()['views'])
+
     def test_redirect_for_anonymous_client(self):
         login_url = reverse('users:login')
         for name, args in (('notes:list', None),
+                           ('notes:search', None),
+                           ('notes:export', None),
                            ('notes:success', None),
                            ('notes:add', None),
                            ('notes:edit', (self.notes.slug,)),
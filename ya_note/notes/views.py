@@ -1,15 +1,47 @@
-from django.contrib.auth.mixins import LoginRequiredMixin
+from django.conf import settings
+from django.contrib.auth.mixins import (
+    LoginRequiredMixin, UserPassesTestMixin
+)
+from django.core.exceptions import BadRequest
+from django.http import JsonResponse
 from django.urls import reverse_lazy
+from django.utils.decorators import method_decorator
 from django.views import generic
+from django.views.decorators.gzip import gzip_page
 
+from .db import pool
+from .export import ENCODERS, stream_export
 from .forms import NoteForm
+from .instrumentation import collector, template_collector
 from .models import Note
+from .pagination import parse_id
+from .ratelimit import RateLimitMixin
+from .search import search_notes
+from .stats import note_count
 
 
 class Home(generic.TemplateView):
-    """Домашняя страница."""
+    """
+    Домашняя страница: для автора ещё число заметок и последние из них.
+
+    Число берётся из ``UserNoteStats``, последние заметки — по индексу
+    ``(author, id)``, поэтому запросов и работы не больше при любом
+    числе заметок.
+    """
     template_name = 'notes/home.html'
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        user = self.request.user
+        if user.is_authenticated:
+            context['note_count'] = note_count(user)
+            context['recent_notes'] = Note.objects.filter(
+                author=user
+            ).only('slug', 'title').order_by('-id')[
+                :settings.NOTES_RECENT_ON_HOME
+            ]
+        return context
+
 
 class NoteSuccess(LoginRequiredMixin, generic.TemplateView):
     """Страница успешного выполнения операции."""
@@ -26,15 +58,14 @@ class NoteBase(LoginRequiredMixin):
         return self.model.objects.filter(author=self.request.user)
 
 
-class NoteCreate(NoteBase, generic.CreateView):
+class NoteCreate(NoteBase, RateLimitMixin, generic.CreateView):
     """Добавление заметки."""
     template_name = 'notes/form.html'
     form_class = NoteForm
+    rate_limit_scope = 'note'
 
     def form_valid(self, form):
-        new_note = form.save(commit=False)
-        new_note.author = self.request.user
-        new_note.save()
+        form.instance.author = self.request.user
         return super().form_valid(form)
 
 
@@ -53,7 +84,79 @@ class NotesList(NoteBase, generic.ListView):
     """Список всех заметок пользователя."""
     template_name = 'notes/list.html'
 
+    def get_queryset(self):
+        """
+        Страница заметок с id больше параметра ``after``.
+
+        Загружаем только поля, которые нужны шаблону, и на одну заметку
+        больше размера страницы, чтобы узнать, есть ли следующая.
+        """
+        queryset = super().get_queryset().only(
+            'id', 'slug', 'title'
+        ).order_by('id')
+        after = self.request.GET.get('after')
+        if after is not None:
+            try:
+                queryset = queryset.filter(id__gt=parse_id(after))
+            except ValueError:
+                raise BadRequest
+        return queryset[:settings.NOTES_COUNT_ON_PAGE + 1]
+
+    def get_context_data(self, **kwargs):
+        size = settings.NOTES_COUNT_ON_PAGE
+        notes = list(self.object_list)
+        context = super().get_context_data(object_list=notes[:size], **kwargs)
+        context['next_after'] = (
+            notes[size - 1].id if len(notes) > size else None
+        )
+        return context
+
+
+class NoteSearch(NoteBase, generic.ListView):
+    """Полнотекстовый поиск по заметкам пользователя."""
+    template_name = 'notes/search.html'
+
+    def get_queryset(self):
+        return search_notes(
+            self.request.GET.get('q', ''),
+            self.request.user,
+            settings.NOTES_COUNT_ON_PAGE,
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.request.GET.get('q', '')
+        return context
+
+
+@method_decorator(gzip_page, name='dispatch')
+class NoteExport(NoteBase, generic.View):
+    """Выгрузка всех заметок пользователя в NDJSON или CSV."""
+    fields = ('id', 'slug', 'title', 'text')
+
+    def get(self, request, *args, **kwargs):
+        fmt = request.GET.get('format', 'ndjson')
+        if fmt not in ENCODERS:
+            raise BadRequest
+        return stream_export(
+            self.get_queryset().order_by('id'), self.fields, fmt, 'notes'
+        )
+
 
 class NoteDetail(NoteBase, generic.DetailView):
     """Заметка подробно."""
     template_name = 'notes/detail.html'
+
+
+class Metrics(LoginRequiredMixin, UserPassesTestMixin, generic.View):
+    """Метрики маршрутов этого процесса, только для персонала."""
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse({
+            'views': collector.snapshot(),
+            'templates': template_collector.snapshot(),
+            'db_pool': dict(pool.stats),
+        })
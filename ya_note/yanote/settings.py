@@ -22,6 +22,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'notes.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -37,7 +38,6 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -45,6 +45,14 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Шаблоны разбираются один раз на процесс и при DEBUG,
+            # см. notes/rendering.py.
+            'loaders': [
+                ('notes.rendering.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
@@ -52,11 +60,38 @@ TEMPLATES = [
 WSGI_APPLICATION = 'yanote.wsgi.application'
 
 
+# Пул соединений на процесс, см. notes/db/pool.py. Для PostgreSQL
+# укажите ENGINE 'notes.db.postgresql' с тем же ключом POOL.
+DATABASE_POOL = {
+    'MAX_SIZE': 8,
+    'TIMEOUT': 10,
+    'MAX_AGE': 600,
+    'CHECK_AFTER': 30,
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'notes.db.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'POOL': DATABASE_POOL,
+    },
+    # Тот же файл только для чтения: в режиме WAL читатели не ждут
+    # писателя. В тестах псевдоним смотрит в тестовую базу default.
+    'replica': {
+        'ENGINE': 'notes.db.sqlite3',
+        'NAME': f'file:{BASE_DIR / "db.sqlite3"}?mode=ro',
+        'POOL': DATABASE_POOL,
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+DATABASE_ROUTERS = ['notes.routers.ReadReplicaRouter']
+
+# PRAGMA для каждого нового соединения SQLite, см. notes/sqlite.py.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 20000,
+    'mmap_size': 256 * 1024 * 1024,
 }
 
 
@@ -87,3 +122,32 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('notes:home')
+
+NOTES_COUNT_ON_PAGE = 100
+
+NOTES_RECENT_ON_HOME = 5
+
+# Асинхронные список заметок и заметка для запуска под ASGI,
+# см. notes/async_views.py.
+NOTES_ASYNC_VIEWS = False
+
+# Ёмкость корзины и период её полного наполнения в секундах.
+RATE_LIMITS = {
+    'note': (10, 60),
+}
+RATE_LIMIT_LRU_SIZE = 10000
+# Псевдоним общего для процессов кэша; None — только память процесса.
+RATE_LIMIT_CACHE = None
+
+# Сколько SQL-запросов допустимо для маршрута, прежде чем писать
+# предупреждение в лог.
+QUERY_BUDGETS = {
+    'notes:home': 4,
+    'notes:success': 2,
+    'notes:list': 3,
+    'notes:search': 4,
+    'notes:add': 8,
+    'notes:detail': 3,
+    'notes:edit': 8,
+    'notes:delete': 6,
+}
@@ -0,0 +1,26 @@
+"""
+Настройки быстрого прогона тестов: ``pytest --ds=yanote.settings_test``.
+
+Дешёвый хэшер паролей и база в памяти, скопированная из заранее
+мигрированного шаблона (см. notes/testing.py). Пул соединений, WAL и
+mmap базе в памяти не нужны.
+"""
+import tempfile
+from pathlib import Path
+
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES, SQLITE_PRAGMAS
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+for database in DATABASES.values():
+    database['POOL'] = None
+
+SQLITE_PRAGMAS = {
+    name: value for name, value in SQLITE_PRAGMAS.items()
+    if name not in ('journal_mode', 'mmap_size')
+}
+
+TEST_DATABASE_TEMPLATE_DIR = (
+    Path(tempfile.gettempdir()) / 'yanote-test-templates'
+)